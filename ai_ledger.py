@@ -0,0 +1,93 @@
+"""
+Dieses Modul protokolliert KI-Aufrufe in der Tabelle `ai_calls` und wertet sie aus.
+
+Je Aufruf werden Provider, Modell, Prompt-Hash und -Größe, gemeldete Tokens,
+Dauer, Anzahl der Wiederholungen sowie Ergebnis und Fehlerklasse gespeichert.
+Die Auswertung liefert Antwortzeit-Perzentile und Durchsatz je Provider und Tag.
+"""
+
+import hashlib
+import math
+
+import database as db
+
+
+def record_call(**fields):
+    """
+    Schreibt einen Aufruf in das Protokoll. Fehler beim Schreiben werden nur
+    gemeldet, damit die eigentliche Analyse nicht daran scheitert.
+    """
+    prompt_text = fields.pop("prompt_text", None)
+    if prompt_text is not None:
+        fields.setdefault("prompt_hash", hashlib.sha256(prompt_text.encode("utf-8")).hexdigest())
+        fields.setdefault("prompt_chars", len(prompt_text))
+    response_text = fields.pop("response_text", None)
+    if response_text is not None:
+        fields.setdefault("response_chars", len(response_text))
+    try:
+        db.insert_ai_call(fields)
+    except db.sqlite3.Error as e:
+        print(f"WARNUNG: KI-Aufruf konnte nicht protokolliert werden: {e}")
+
+
+def _percentile(sorted_values, percentile):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(percentile / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _summarize(rows):
+    """Fasst eine Menge von Aufrufen zu Kennzahlen zusammen."""
+    provider_calls = [row for row in rows if row["outcome"] != "cache_hit"]
+    latencies = sorted(row["latency_ms"] for row in provider_calls
+                       if row["latency_ms"] is not None and row["outcome"] != "error")
+    outcomes = {}
+    for row in rows:
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+    errors = {}
+    for row in rows:
+        if row["error_class"]:
+            errors[row["error_class"]] = errors.get(row["error_class"], 0) + 1
+    prompt_tokens = [row["prompt_tokens"] or row["estimated_prompt_tokens"] or 0
+                     for row in provider_calls]
+    completion_tokens = [row["completion_tokens"] or 0 for row in provider_calls]
+    return {
+        "calls": len(rows),
+        "provider_calls": len(provider_calls),
+        "success": outcomes.get("success", 0),
+        "cache_hits": outcomes.get("cache_hit", 0),
+        "errors": outcomes.get("error", 0) + outcomes.get("invalid_response", 0),
+        "success_rate": (round(outcomes.get("success", 0) / len(provider_calls), 3)
+                         if provider_calls else None),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else None,
+        "retries": sum(row["retries"] or 0 for row in provider_calls),
+        "prompt_tokens": sum(prompt_tokens),
+        "completion_tokens": sum(completion_tokens),
+        "error_classes": errors,
+    }
+
+
+def summarize_calls(days=14):
+    """
+    Wertet die Aufrufe der letzten `days` Tage aus: Kennzahlen je Provider
+    insgesamt sowie je Provider und Tag (Durchsatz und Perzentile).
+    """
+    rows = db.get_ai_calls_since(days)
+    by_provider = {}
+    by_day = {}
+    for row in rows:
+        by_provider.setdefault(row["provider"], []).append(row)
+        by_day.setdefault((row["day"], row["provider"]), []).append(row)
+    return {
+        "days": days,
+        "providers": {provider: _summarize(provider_rows)
+                      for provider, provider_rows in sorted(by_provider.items())},
+        "daily": [
+            {"day": day, "provider": provider, **_summarize(day_rows)}
+            for (day, provider), day_rows in sorted(by_day.items(), reverse=True)
+        ],
+    }
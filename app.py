@@ -2,6 +2,7 @@
 """Dieses Modul initialisiert die Flask-Anwendung und registriert alle Blueprints."""
 
 import os
+import sys
 from datetime import UTC, datetime
 from flask import Flask, render_template, url_for
 
@@ -26,6 +27,20 @@ app.register_blueprint(data_io_bp)
 app.register_blueprint(prompts_bp)
 
 
+# Beim Start über die Flask-CLI oder einen WSGI-Server wird nicht migriert; ein veraltetes
+# Schema soll sofort auffallen und nicht erst beim ersten Speichern.
+# `python app.py` und `flask migrate-db` migrieren selbst.
+if __name__ != "__main__" and "migrate-db" not in sys.argv[1:]:
+    db.check_schema()
+
+
+@app.cli.command("migrate-db")
+def migrate_db_command():
+    """Ergänzt eine bestehende Datenbank um neue Tabellen und Spalten."""
+    db.migrate_db()
+    print("Datenbank ist auf dem aktuellen Stand.")
+
+
 # --- ZENTRALE FUNKTIONEN ---
 
 @app.teardown_appcontext
@@ -86,4 +101,6 @@ def info():
 # --- ANWENDUNG STARTEN ---
 
 if __name__ == "__main__":
+    # Migrationen nur beim Start, nicht beim Import (CLI, Benchmarks, Worker-Prozesse).
+    db.migrate_db()
     app.run(port=5001, debug=True)
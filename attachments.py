@@ -0,0 +1,57 @@
+"""
+Dieses Modul verwaltet serverseitig gespeicherte Anhänge für KI-Analysen.
+
+Der aus hochgeladenen Dateien extrahierte Text wird einmalig unter seinem
+SHA-256-Hash abgelegt. Batch-Aufrufe referenzieren Anhänge nur noch über
+diese ID, statt den gesamten Text bei jedem Teilnehmer erneut zu übertragen.
+Nicht mehr genutzte Anhänge laufen nach `ATTACHMENT_TTL_SECONDS` ab.
+"""
+
+import hashlib
+import os
+
+from disk_cache import DiskCache
+
+ATTACHMENT_TTL_SECONDS = int(os.getenv("ATTACHMENT_TTL_SECONDS", str(24 * 3600)))
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(200 * 1024 * 1024)))
+ATTACHMENT_SEPARATOR = "\n\n---\n\n"
+
+_store = DiskCache("attachments", max_bytes=ATTACHMENT_MAX_BYTES,
+                   ttl_seconds=ATTACHMENT_TTL_SECONDS, suffix=".txt")
+
+
+def store_attachment(text):
+    """Speichert einen extrahierten Text und gibt seine inhaltsbasierte ID zurück."""
+    data = text.encode("utf-8")
+    attachment_id = hashlib.sha256(data).hexdigest()
+    if _store.get_path(attachment_id) is None:
+        _store.put(attachment_id, data)
+    return attachment_id
+
+
+def load_attachment(attachment_id):
+    """Lädt den Text eines Anhangs oder gibt None zurück, wenn er abgelaufen ist."""
+    try:
+        data = _store.get(attachment_id)
+    except ValueError:
+        return None
+    return data.decode("utf-8") if data is not None else None
+
+
+def resolve_attachments(attachment_ids):
+    """
+    Setzt die Texte mehrerer Anhänge zusammen.
+    Wirft einen ValueError, wenn ein Anhang unbekannt oder abgelaufen ist.
+    """
+    texts = []
+    for attachment_id in attachment_ids or []:
+        text = load_attachment(attachment_id)
+        if text is None:
+            raise ValueError(f"Anhang '{attachment_id}' ist nicht (mehr) vorhanden.")
+        texts.append(text)
+    return ATTACHMENT_SEPARATOR.join(texts)
+
+
+def stats():
+    """Gibt die Kennzahlen des Anhangspeichers zurück."""
+    return _store.stats()
@@ -0,0 +1,135 @@
+"""
+Dieses Modul stellt eine einfache Verwaltung für Hintergrund-Jobs bereit.
+
+Ein Job besteht aus mehreren Einträgen (z. B. Teilnehmern), deren Fortschritt
+einzeln verfolgt wird. Die eigentliche Arbeit läuft in benannten, begrenzten
+Thread-Pools, die prozessweit geteilt werden, sodass das Parallelitätslimit
+auch über mehrere gleichzeitige Jobs hinweg gilt.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_RETENTION_SECONDS = 3600
+TERMINAL_STATES = ("success", "error", "skipped")
+
+_JOBS = {}
+_POOLS = {}
+_LOCK = threading.Lock()
+
+
+class Job:
+    """Hält den Zustand eines Hintergrund-Jobs und seiner Einträge."""
+
+    def __init__(self, kind, item_ids, meta=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self.items = {str(item_id): {"status": "pending", "message": ""}
+                      for item_id in item_ids}
+        self.result = None
+        self._pending_tasks = 0
+        self._lock = threading.Lock()
+
+    def update_item(self, item_id, status, message="", **extra):
+        """Aktualisiert Status und Meldung eines einzelnen Eintrags."""
+        with self._lock:
+            item = self.items.setdefault(str(item_id), {})
+            item.update(extra, status=status, message=message)
+
+    @property
+    def finished(self):
+        """Gibt an, ob alle Aufgaben des Jobs abgearbeitet wurden."""
+        return self.finished_at is not None
+
+    def _task_done(self):
+        with self._lock:
+            self._pending_tasks -= 1
+            if self._pending_tasks <= 0:
+                self.finished_at = time.time()
+
+    def to_dict(self):
+        """Gibt den Job-Zustand als JSON-serialisierbares Dictionary zurück."""
+        with self._lock:
+            items = {key: dict(value) for key, value in self.items.items()}
+        counts = {}
+        for item in items.values():
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        done = sum(counts.get(state, 0) for state in TERMINAL_STATES)
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": "finished" if self.finished else "running",
+            "total": len(items),
+            "done": done,
+            "counts": counts,
+            "items": items,
+            "elapsed_seconds": round(end - self.created_at, 2),
+            "result": self.result,
+        }
+
+
+def _get_pool(pool_name, max_workers):
+    """Gibt den benannten Thread-Pool zurück und legt ihn bei Bedarf an."""
+    with _LOCK:
+        pool = _POOLS.get(pool_name)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                      thread_name_prefix=f"job-{pool_name}")
+            _POOLS[pool_name] = pool
+        return pool
+
+
+def _prune_jobs():
+    """Entfernt abgeschlossene Jobs, die älter als die Aufbewahrungsdauer sind."""
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    for job_id in [jid for jid, job in _JOBS.items()
+                   if job.finished and job.finished_at < cutoff]:
+        del _JOBS[job_id]
+
+
+def _run_task(job, func, args):
+    """Führt eine Aufgabe aus und markiert Fehler, ohne den Pool zu blockieren."""
+    try:
+        func(job, *args)
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"!!! FEHLER IM HINTERGRUND-JOB {job.id} ({job.kind}) !!!\n{e}")
+        item_ids = args[0] if args and isinstance(args[0], (list, tuple)) else args[:1]
+        for item_id in item_ids:
+            job.update_item(item_id, "error", f"Interner Fehler: {e}")
+    finally:
+        job._task_done()  # pylint: disable=protected-access
+
+
+def submit_job(kind, item_ids, tasks, pool_name, max_workers, meta=None):
+    """
+    Legt einen Job an und reicht seine Aufgaben im benannten Pool ein.
+
+    `tasks` ist eine Liste von `(func, args)`-Tupeln; jede Funktion wird als
+    `func(job, *args)` aufgerufen und meldet den Fortschritt über
+    `job.update_item`. Das erste Argument gilt als Eintrags-ID (bzw. Liste von
+    Eintrags-IDs) für Fehler.
+    """
+    job = Job(kind, item_ids, meta)
+    job._pending_tasks = len(tasks)  # pylint: disable=protected-access
+    if not tasks:
+        job.finished_at = time.time()
+    with _LOCK:
+        _prune_jobs()
+        _JOBS[job.id] = job
+
+    pool = _get_pool(pool_name, max_workers)
+    for func, args in tasks:
+        pool.submit(_run_task, job, func, args)
+    return job
+
+
+def get_job(job_id):
+    """Holt einen Job anhand seiner ID."""
+    with _LOCK:
+        return _JOBS.get(job_id)
@@ -0,0 +1,96 @@
+"""
+Vergleicht das Gruppen-PDF in einem WeasyPrint-Durchlauf mit N einzelnen PDFs.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python benchmarks/bench_group_pdf.py [--participants 20] [--runs 3]
+
+Es werden synthetische Teilnehmer verwendet; die Datenbank wird nicht gelesen.
+Gemessen wird nur WeasyPrint (über denselben `PdfRenderer` wie die App), das
+HTML wird vorab einmal gerendert.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+LOREM = ("Die Person zeigte in den Übungen ein hohes Maß an Eigeninitiative und "
+         "ging offen auf die anderen Teilnehmenden zu. ")
+
+
+def make_participants(count, seed=1):
+    """Erzeugt `count` Teilnehmer mit zufälligen Bewertungen und Texten."""
+    rng = random.Random(seed)
+    sk_keys = ['flexibility', 'team_orientation', 'process_orientation', 'results_orientation']
+    vk_keys = ['flexibility', 'consulting', 'objectivity', 'goal_orientation']
+    return [
+        {
+            "id": index + 1,
+            "name": f"Teilnehmer {index + 1}",
+            "sk_ratings": {key: rng.randint(3, 9) for key in sk_keys},
+            "vk_ratings": {key: rng.randint(3, 9) for key in vk_keys},
+            "ki_texts": {"social_text": LOREM * 6, "verbal_text": LOREM * 6,
+                         "summary_text": LOREM * 4},
+            "footer_data": {},
+        }
+        for index in range(count)
+    ]
+
+
+def best_of(runs, func):
+    """Führt `func` mehrfach aus und gibt die schnellste Dauer und das letzte Ergebnis zurück."""
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    """Rendert die Berichte einzeln und gemeinsam und gibt Dauer und Größe aus."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from app import app  # pylint: disable=import-outside-toplevel
+    from blueprints import analysis  # pylint: disable=import-outside-toplevel
+    from pdf_rendering import PdfRenderer  # pylint: disable=import-outside-toplevel
+
+    participants = make_participants(args.participants)
+    group = {"id": 1, "name": "Benchmark", "date": "2025-01-01", "location": "Lingen (Ems)",
+             "leitung": "Leitung", "beobachter1": "A", "beobachter2": "B"}
+    with app.test_request_context("/"):
+        single_html = [analysis._report_pdf_html(p, group)  # pylint: disable=protected-access
+                       for p in participants]
+        merged_html = analysis._group_pdf_html(  # pylint: disable=protected-access
+            participants, group)
+
+    renderer = PdfRenderer()
+    renderer.render(single_html[0])  # Webfonts und Stylesheet vorab laden
+    single_seconds, single_pdfs = best_of(
+        args.runs, lambda: [renderer.render(html) for html in single_html]
+    )
+    merged_seconds, merged_pdf = best_of(args.runs, lambda: renderer.render(merged_html))
+
+    count = args.participants
+    print(f"{count} Teilnehmer, schnellster von {args.runs} Läufen:")
+    print(f"  einzeln:   {single_seconds:7.2f} s  "
+          f"({single_seconds / count * 1000:6.0f} ms/Bericht, "
+          f"{sum(len(pdf) for pdf in single_pdfs) / 1024:8.0f} KiB gesamt)")
+    print(f"  gemeinsam: {merged_seconds:7.2f} s  "
+          f"({merged_seconds / count * 1000:6.0f} ms/Bericht, "
+          f"{len(merged_pdf) / 1024:8.0f} KiB)")
+    print(f"  Faktor:    {single_seconds / merged_seconds:7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
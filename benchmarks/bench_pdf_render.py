@@ -0,0 +1,87 @@
+"""
+Misst die Latenz pro PDF-Bericht mit und ohne wiederverwendeten PdfRenderer.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python benchmarks/bench_pdf_render.py [--runs 20]
+
+"vorher" legt für jeden Bericht einen neuen Renderer an (Schriftkonfiguration,
+Stylesheet und Webfonts werden jedes Mal neu geladen, wie beim früheren
+`HTML(...).write_pdf()` je Aufruf). "nachher" nutzt einen Renderer für alle
+Berichte. "Pool" rendert über `pdf_rendering.render_pdf_in_pool` aus einem
+neuen Thread je Bericht, wie es der Entwicklungsserver pro Request tut. Es wird
+ein synthetischer Teilnehmer verwendet.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(runs, render):
+    """Führt `render` mehrfach aus und gibt die Dauern in Millisekunden zurück."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summary(label, timings):
+    """Formatiert Median, p95 und Maximum einer Messreihe."""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return (f"  {label:<8} median {statistics.median(ordered):7.1f} ms   "
+            f"p95 {p95:7.1f} ms   max {ordered[-1]:7.1f} ms")
+
+
+def main():
+    """Rendert denselben Bericht wiederholt mit frischem und mit wiederverwendetem Renderer."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    from app import app  # pylint: disable=import-outside-toplevel
+    from blueprints import analysis  # pylint: disable=import-outside-toplevel
+    from bench_group_pdf import make_participants  # pylint: disable=import-outside-toplevel
+    import pdf_rendering  # pylint: disable=import-outside-toplevel
+    from pdf_rendering import PdfRenderer  # pylint: disable=import-outside-toplevel
+
+    participant = make_participants(1)[0]
+    group = {"id": 1, "name": "Benchmark", "date": "2025-01-01", "location": "Lingen (Ems)",
+             "leitung": "Leitung", "beobachter1": "A", "beobachter2": "B"}
+    with app.test_request_context("/"):
+        html = analysis._report_pdf_html(participant, group)  # pylint: disable=protected-access
+
+    before = measure(args.runs, lambda: PdfRenderer().render(html))
+    renderer = PdfRenderer()
+    cold = measure(1, lambda: renderer.render(html))
+    after = measure(args.runs, lambda: renderer.render(html))
+
+    def render_in_new_thread():
+        thread = threading.Thread(target=pdf_rendering.render_pdf_in_pool, args=(html,))
+        thread.start()
+        thread.join()
+
+    render_in_new_thread()  # Pool und Renderer der Worker anlegen
+    threaded = measure(args.runs, render_in_new_thread)
+
+    print(f"Latenz pro Bericht ({args.runs} Läufe):")
+    print(summary("vorher", before))
+    print(summary("nachher", after))
+    print(summary("Pool", threaded))
+    print(f"  erster Bericht mit neuem Renderer: {cold[0]:.1f} ms")
+    print(f"  Faktor (Median): {statistics.median(before) / statistics.median(after):.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Vergleicht Auswertungen der Bewertungen über die JSON-Spalten (json.loads je
+Zeile in Python) mit den SQL-Aggregationen über participant_ratings.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python benchmarks/bench_ratings.py [--participants 20000] [--groups 1000] [--runs 5]
+
+Die Daten werden in einer temporären Datenbank erzeugt; database.db bleibt unberührt.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+SK_KEYS = ['flexibility', 'team_orientation', 'process_orientation', 'results_orientation']
+VK_KEYS = ['flexibility', 'consulting', 'objectivity', 'goal_orientation']
+
+
+def best_of(runs, func):
+    """Führt `func` mehrfach aus; gibt die schnellste Dauer (ms) und das letzte Ergebnis zurück."""
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def populate(db, participants, groups, seed=1):
+    """Legt Gruppen und Teilnehmer mit zufälligen Bewertungen an (inkl. participant_ratings)."""
+    rng = random.Random(seed)
+    conn = db.get_db()
+    conn.executemany("INSERT INTO groups (id, name) VALUES (?, ?)",
+                     [(group_id, f"Gruppe {group_id}") for group_id in range(1, groups + 1)])
+    rows, rating_rows = [], []
+    for participant_id in range(1, participants + 1):
+        group_id = rng.randint(1, groups)
+        ratings = {
+            "sk_ratings": {key: rng.randint(0, 20) / 2 for key in SK_KEYS},
+            "vk_ratings": {key: rng.randint(0, 20) / 2 for key in VK_KEYS},
+        }
+        rows.append((participant_id, group_id, f"Teilnehmer {participant_id}",
+                     json.dumps(ratings["sk_ratings"]), json.dumps(ratings["vk_ratings"])))
+        for column, scale in db.RATING_SCALES.items():
+            rating_rows.extend(db._rating_rows(  # pylint: disable=protected-access
+                participant_id, group_id, scale, ratings[column]))
+    conn.executemany("INSERT INTO participants (id, group_id, name, sk_ratings, vk_ratings) "
+                     "VALUES (?, ?, ?, ?, ?)", rows)
+    db._insert_ratings(conn, rating_rows)  # pylint: disable=protected-access
+    conn.commit()
+
+
+def python_group_averages(db, group_id):
+    """Bisheriger Weg: JSON-Spalten der Gruppe laden und in Python mitteln."""
+    sums = {}
+    for row in db.query_db("SELECT sk_ratings, vk_ratings FROM participants WHERE group_id = ?",
+                           (group_id,)):
+        for column, scale in db.RATING_SCALES.items():
+            for key, value in json.loads(row[column] or "{}").items():
+                if value:
+                    entry = sums.setdefault((scale, key), [0.0, 0])
+                    entry[0] += value
+                    entry[1] += 1
+    return {key: total / count for key, (total, count) in sums.items()}
+
+
+def python_distribution(db):
+    """Bisheriger Weg: alle JSON-Spalten laden und die Verteilung in Python zählen."""
+    counts = {}
+    for row in db.query_db("SELECT sk_ratings, vk_ratings FROM participants"):
+        for column, scale in db.RATING_SCALES.items():
+            for key, value in json.loads(row[column] or "{}").items():
+                if value:
+                    counts[(scale, key, value)] = counts.get((scale, key, value), 0) + 1
+    return counts
+
+
+def main():
+    """Erzeugt Testdaten und misst beide Varianten."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--participants", type=int, default=20000)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # pylint: disable=import-outside-toplevel
+    from flask import Flask
+    import database as db
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.DATABASE = os.path.join(tmp_dir, "bench.db")
+        with open(os.path.join(PROJECT_ROOT, "schema.sql"), encoding="utf-8") as handle:
+            schema = handle.read()
+        with Flask(__name__).app_context():
+            db.get_db().executescript(schema)
+            populate(db, args.participants, args.groups)
+
+            measurements = [
+                ("Gruppendurchschnitt", lambda: python_group_averages(db, 1),
+                 lambda: db.get_group_rating_averages(1)),
+                ("Verteilung gesamt", lambda: python_distribution(db),
+                 db.get_rating_distribution),
+            ]
+            print(f"{args.participants} Teilnehmer in {args.groups} Gruppen, "
+                  f"schnellster von {args.runs} Läufen:")
+            for label, before, after in measurements:
+                before_ms, _ = best_of(args.runs, before)
+                after_ms, _ = best_of(args.runs, after)
+                print(f"  {label:<20} JSON/Python {before_ms:8.2f} ms   SQL {after_ms:8.2f} ms   "
+                      f"Faktor {before_ms / after_ms:6.1f}x")
+            counts_ms, _ = best_of(args.runs, db.get_rated_participant_counts)
+            print(f"  {'Bewertete je Gruppe':<20} SQL {counts_ms:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Misst die Importzeit von `app` in einem frischen Python-Prozess und prüft sie
+gegen ein Budget.
+
+Aufruf aus dem Projektverzeichnis:
+
+    python benchmarks/import_budget.py [--budget 0.8] [--runs 5]
+
+Das Skript schlägt fehl (Exit-Code 1), wenn die schnellste Messung das Budget
+überschreitet oder beim Import eine der schweren Bibliotheken geladen wurde,
+die erst bei Bedarf importiert werden sollen.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "0.8"))
+
+# Diese Module dürfen beim Start der Anwendung nicht geladen werden.
+DEFERRED_MODULES = [
+    "google.generativeai", "mistralai", "matplotlib", "numpy", "pandas",
+    "weasyprint", "pdfminer", "docx",
+]
+
+_MEASURE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app  # noqa: F401
+elapsed = time.perf_counter() - start
+loaded = [m for m in {deferred!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def measure_once():
+    """Importiert `app` in einem neuen Interpreter und gibt Dauer und geladene Module zurück."""
+    script = _MEASURE_SCRIPT.format(deferred=DEFERRED_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_ROOT,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """Führt die Messungen aus und vergleicht das Ergebnis mit dem Budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    timings = sorted(r["seconds"] for r in results)
+    loaded = sorted({m for r in results for m in r["loaded"]})
+
+    print(f"import app: min {timings[0] * 1000:.0f} ms, "
+          f"median {timings[len(timings) // 2] * 1000:.0f} ms "
+          f"({args.runs} Läufe, Budget {args.budget * 1000:.0f} ms)")
+    failed = False
+    if loaded:
+        print(f"FEHLER: Beim Import geladene schwere Module: {', '.join(loaded)}")
+        failed = True
+    if timings[0] > args.budget:
+        print("FEHLER: Importzeit überschreitet das Budget.")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
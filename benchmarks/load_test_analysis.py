@@ -0,0 +1,126 @@
+"""
+Lasttest für die KI-Analyse-Routen gegen eine laufende Instanz der App.
+
+Gedacht für den Einsatz mit dem Offline-Provider `local-stub`:
+
+    KI_STUB_ENABLED=1 KI_STUB_LATENCY_MS=1500 KI_CONCURRENCY_LOCAL_STUB=8 python app.py
+    python benchmarks/load_test_analysis.py single --ids 1-40 --concurrency 8
+    python benchmarks/load_test_analysis.py batch --ids 1-40
+
+Der Modus `single` ruft `/api/run_single_analysis/<id>` parallel auf, der Modus
+`batch` startet einen Batch-Job über `/ai_analysis/execute` und fragt dessen
+Status ab, bis alle Teilnehmer abgeschlossen sind.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PROMPT = "Analysiere die folgenden Beobachtungen:\n{{context}}"
+
+
+def parse_ids(value):
+    """Wandelt '1-5,8' in eine Liste von IDs um."""
+    ids = []
+    for part in value.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            ids.extend(range(int(start), int(end) + 1))
+        elif part.strip():
+            ids.append(int(part))
+    return ids
+
+
+def percentile(values, pct):
+    """Einfaches Perzentil (nächster Rang) einer Liste von Werten."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _post(url, data, content_type):
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return response.read().decode("utf-8")
+
+
+def run_single(args, ids):
+    """Ruft die Einzel-API parallel auf und misst Latenzen und Durchsatz."""
+    payload = json.dumps({
+        "prompt_template": args.prompt, "ki_model": args.model,
+        "use_cache": not args.bypass_cache,
+    }).encode("utf-8")
+
+    def call(participant_id):
+        start = time.perf_counter()
+        body = _post(f"{args.base_url}/api/run_single_analysis/{participant_id}",
+                     payload, "application/json")
+        return time.perf_counter() - start, json.loads(body).get("status")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(call, ids))
+    wall = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, status in results if status != "success")
+    print(f"{len(ids)} Anfragen, Parallelität {args.concurrency}: {wall:.2f}s gesamt, "
+          f"{len(ids) / wall:.2f} Anfragen/s, {errors} Fehler")
+    print(f"Latenz p50 {percentile(latencies, 50):.2f}s, p95 {percentile(latencies, 95):.2f}s, "
+          f"p99 {percentile(latencies, 99):.2f}s")
+
+
+def run_batch(args, ids):
+    """Startet einen Batch-Job und wartet auf dessen Abschluss."""
+    form = [("participant_ids", str(pid)) for pid in ids]
+    form += [("ki_prompt", args.prompt), ("ki_model", args.model)]
+    if args.bypass_cache:
+        form.append(("bypass_cache", "on"))
+    start = time.perf_counter()
+    page = _post(f"{args.base_url}/ai_analysis/execute",
+                 urllib.parse.urlencode(form).encode("utf-8"),
+                 "application/x-www-form-urlencoded")
+    match = re.search(r"/api/ai_analysis/jobs/([0-9a-f]+)", page)
+    if not match:
+        print("FEHLER: Job-ID nicht in der Statusseite gefunden.")
+        return 1
+
+    status_url = f"{args.base_url}/api/ai_analysis/jobs/{match.group(1)}"
+    while True:
+        with urllib.request.urlopen(status_url, timeout=30) as response:
+            job = json.loads(response.read().decode("utf-8"))
+        if job["status"] == "finished":
+            break
+        time.sleep(0.5)
+    wall = time.perf_counter() - start
+    print(f"Batch mit {job['total']} Teilnehmern: {wall:.2f}s gesamt, "
+          f"{job['total'] / wall:.2f} Teilnehmer/s, Status: {job['counts']}")
+    return 0
+
+
+def main():
+    """Liest die Argumente und startet den gewählten Lasttest."""
+    parser = argparse.ArgumentParser(description="Lasttest für die KI-Analyse-Routen.")
+    parser.add_argument("mode", choices=["single", "batch"])
+    parser.add_argument("--ids", required=True, help="Teilnehmer-IDs, z. B. 1-40")
+    parser.add_argument("--base-url", default="http://localhost:5001")
+    parser.add_argument("--model", default="local-stub")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bypass-cache", action="store_true")
+    args = parser.parse_args()
+
+    ids = parse_ids(args.ids)
+    if args.mode == "single":
+        run_single(args, ids)
+        return 0
+    return run_batch(args, ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
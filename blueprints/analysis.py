@@ -1,59 +1,42 @@
 # blueprints/analysis.py
 """Dieses Modul enthält Routen für Analyse, KI-Integration und Berichtserstellung."""
 
-import base64
 import json
-from io import BytesIO
+import os
 from datetime import datetime
 import pytz
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import numpy as np
-
 from flask import (Blueprint, request, redirect, url_for, flash, render_template,
-                   jsonify, Response)
-from weasyprint import HTML
+                   jsonify, Response, current_app, send_file, stream_with_context)
 
+import ai_ledger
+import attachments
+import charts
 import database as db
-from ki_services import generate_report_with_ai
-from utils import clean_json_response, get_file_content
+import ki_cache
+import ki_circuit
+import ki_hedging
+import pdf_cache
+import pdf_prerender
+import pdf_rendering
+import prompt_rendering
+from background_jobs import submit_job, get_job
+from ki_providers import is_known_provider
+from ki_services import (generate_report_with_ai, get_provider_concurrency,
+                         model_identity, stream_report_with_ai)
+from utils import clean_json_response, extraction_cache_stats, get_files_content
 
 analysis_bp = Blueprint('analysis', __name__)
 
+# Modi für Batch-Analysen: alle Teilnehmer, nur mit geänderten Eingaben oder nur
+# zuletzt fehlgeschlagene.
+RERUN_MODES = ("all", "changed", "failed")
 
-# --- HILFSFUNKTION FÜR DIAGRAMME ---
+# Mit PDF_ASYNC=1 erzeugt /bericht/<id>/pdf nicht zwischengespeicherte Berichte als Hintergrund-Job.
+PDF_ASYNC_ENABLED = os.getenv("PDF_ASYNC", "0").lower() in ("1", "true", "yes", "on")
 
-def create_radar_chart(ratings_dict, keys, labels, color):
-    """Erzeugt ein Radardiagramm und gibt es als Base64-Bild zurück."""
-    values = [ratings_dict.get(key, 0) for key in keys]
-    num_vars = len(labels)
-    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-    values_plot = values + values[:1]
-    angles_plot = angles + angles[:1]
-
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw={"polar": True})
-    ax.fill(angles_plot, values_plot, color=color, alpha=0.2)
-    ax.plot(angles_plot, values_plot, color=color, linewidth=2)
-    ax.grid(color='#E0E0E0', linestyle='-', linewidth=0.7)
-    ax.spines['polar'].set_edgecolor('#E0E0EE')
-    ax.set_yticklabels([])
-    ax.set_rlim(0, 10)
-    ax.set_xticks(angles)
-    ax.set_xticklabels(labels, size=12, fontfamily='sans-serif')
-    ax.set_theta_offset(np.pi / 2)
-    ax.set_theta_direction(-1)
-    ax.tick_params(axis='x', pad=15)
-
-    buf = BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', transparent=True, pad_inches=0.2)
-    plt.close(fig)
-    buf.seek(0)
-
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    return f"data:image/png;base64,{img_base64}"
 
+# --- HILFSFUNKTION FÜR DIAGRAMME ---
 
 def _prepare_pdf_data(participant):
     """Bereitet die Daten und Diagramme für den PDF-Bericht vor."""
@@ -66,8 +49,8 @@ def _prepare_pdf_data(participant):
     vk_labels = ['Flexibilität', 'Beratung', 'Sachlichkeit', 'Ziel-\norientierung']
     vk_keys = ['flexibility', 'consulting', 'objectivity', 'goal_orientation']
 
-    sk_chart = create_radar_chart(sk_ratings, sk_keys, sk_labels, '#5A7D7C')
-    vk_chart = create_radar_chart(vk_ratings, vk_keys, vk_labels, '#2F4F4F')
+    sk_chart = charts.create_radar_chart(sk_ratings, sk_keys, sk_labels, '#5A7D7C')
+    vk_chart = charts.create_radar_chart(vk_ratings, vk_keys, vk_labels, '#2F4F4F')
     return sk_chart, vk_chart
 
 
@@ -92,33 +75,108 @@ def edit_report(participant_id):
                            current_location=current_location)
 
 
-@analysis_bp.route('/bericht/<int:participant_id>/pdf')
-def bericht_pdf(participant_id):
-    """Generiert eine PDF-Version des Berichts serverseitig."""
-    participant = db.get_participant_by_id(participant_id)
-    if not participant:
-        return "Teilnehmer nicht gefunden", 404
-
-    group = db.get_group_by_id(participant['group_id'])
+def _report_date_and_location():
+    """Gibt das tagesaktuelle Datum und den Ort für die Fußzeile der PDF-Berichte zurück."""
     german_tz = pytz.timezone('Europe/Berlin')
     current_date = datetime.now(pytz.utc).astimezone(german_tz).strftime("%d.%m.%Y")
-    current_location = "Lingen (Ems)"
+    return current_date, "Lingen (Ems)"
+
 
+def _report_pdf_html(participant, group):
+    """Rendert das HTML des PDF-Berichts für einen Teilnehmer."""
+    current_date, current_location = _report_date_and_location()
     sk_chart_image, vk_chart_image = _prepare_pdf_data(participant)
 
-    html_string = render_template('bericht_pdf_vorlage.html',
-                                  participant=participant, group=group,
-                                  current_date=current_date,
-                                  current_location=current_location,
-                                  sk_chart_image=sk_chart_image,
-                                  vk_chart_image=vk_chart_image, _external=True)
+    return render_template('bericht_pdf_vorlage.html',
+                           participant=participant, group=group,
+                           current_date=current_date,
+                           current_location=current_location,
+                           sk_chart_image=sk_chart_image,
+                           vk_chart_image=vk_chart_image, _external=True)
+
+
+def _group_pdf_html(participants, group):
+    """Rendert die Berichte mehrerer Teilnehmer als ein HTML-Dokument mit Seitenumbrüchen."""
+    current_date, current_location = _report_date_and_location()
+    reports = []
+    for participant in participants:
+        sk_chart_image, vk_chart_image = _prepare_pdf_data(participant)
+        reports.append({"participant": participant,
+                        "sk_chart_image": sk_chart_image,
+                        "vk_chart_image": vk_chart_image})
+
+    return render_template('bericht_pdf_gruppe.html',
+                           reports=reports, group=group,
+                           current_date=current_date,
+                           current_location=current_location, _external=True)
+
 
-    pdf_bytes = HTML(string=html_string, base_url=request.base_url).write_pdf()
+def _report_cache_key(participant, group):
+    """Schlüssel des PDF-Berichts im PDF-Cache (Teilnehmer, Gruppe, Vorlagen, Datum)."""
+    current_date, _ = _report_date_and_location()
+    template_dir = os.path.join(current_app.root_path, current_app.template_folder)
+    return pdf_cache.report_key(participant, group, current_date,
+                                pdf_cache.template_fingerprint(template_dir))
 
+
+def _report_filename(participant):
+    """Gibt den Dateinamen des PDF-Berichts für einen Teilnehmer zurück."""
     safe_name = "".join(c for c in participant.get('name', 'Unbekannt')
                         if c.isalnum() or c in (' ', '_')).rstrip()
-    filename = f"Staerkenanalyse_{safe_name.replace(' ', '_')}.pdf"
+    return f"Staerkenanalyse_{safe_name.replace(' ', '_')}.pdf"
+
+
+@analysis_bp.route('/bericht/<int:participant_id>/pdf')
+def bericht_pdf(participant_id):
+    """Generiert eine PDF-Version des Berichts serverseitig."""
+    participant = db.get_participant_by_id(participant_id)
+    if not participant:
+        return "Teilnehmer nicht gefunden", 404
 
+    group = db.get_group_by_id(participant['group_id'])
+    filename = _report_filename(participant)
+    # Bereits erzeugte Berichte werden direkt als Datei aus dem PDF-Cache ausgeliefert.
+    cache_key = _report_cache_key(participant, group)
+    path = pdf_cache.get_path(cache_key)
+    if path is None and PDF_ASYNC_ENABLED:
+        job = _submit_pdf_job([participant], group)
+        return redirect(url_for("analysis.pdf_job_page", job_id=job.id))
+    if path is None:
+        html_string = _report_pdf_html(participant, group)
+        pdf_bytes = pdf_rendering.render_pdf_in_pool(html_string, request.base_url)
+        path = pdf_cache.put(cache_key, pdf_bytes)
+        if path is None:
+            return Response(
+                pdf_bytes,
+                mimetype="application/pdf",
+                headers={"Content-disposition": f"attachment; filename=\"{filename}\""}
+            )
+
+    return send_file(path, mimetype="application/pdf", as_attachment=True,
+                     download_name=filename)
+
+
+@analysis_bp.route('/gruppe/<int:group_id>/berichte.pdf')
+def group_reports_pdf(group_id):
+    """
+    Erzeugt ein gemeinsames PDF mit den Berichten aller Teilnehmer einer Gruppe.
+    Alle Berichte werden in einem einzigen WeasyPrint-Durchlauf gesetzt.
+    """
+    group = db.get_group_by_id(group_id)
+    if not group:
+        return "Gruppe nicht gefunden", 404
+    participants = [db.get_participant_by_id(row["id"])
+                    for row in db.get_participants_by_group(group_id)]
+    participants = [p for p in participants if p]
+    if not participants:
+        flash("Die Gruppe enthält keine Teilnehmer.", "warning")
+        return redirect(url_for("groups.show_group_participants", group_id=group_id))
+
+    html_string = _group_pdf_html(participants, group)
+    pdf_bytes = pdf_rendering.render_pdf_in_pool(html_string, request.base_url)
+
+    safe_group = "".join(c for c in group["name"] if c.isalnum() or c in (' ', '_')).rstrip()
+    filename = f"Staerkenanalysen_{safe_group.replace(' ', '_')}.pdf"
     return Response(
         pdf_bytes,
         mimetype="application/pdf",
@@ -126,6 +184,219 @@ def bericht_pdf(participant_id):
     )
 
 
+@analysis_bp.route('/gruppe/<int:group_id>/berichte.zip')
+def group_reports_zip(group_id):
+    """
+    Erzeugt die PDF-Berichte aller Teilnehmer einer Gruppe parallel im
+    Prozess-Pool und streamt sie als ZIP-Datei, sobald sie fertig sind.
+    Berichte aus dem PDF-Cache werden ohne erneutes Rendern übernommen.
+    """
+    group = db.get_group_by_id(group_id)
+    if not group:
+        return "Gruppe nicht gefunden", 404
+    participant_ids = [row["id"] for row in db.get_participants_by_group(group_id)]
+    if not participant_ids:
+        flash("Die Gruppe enthält keine Teilnehmer.", "warning")
+        return redirect(url_for("groups.show_group_participants", group_id=group_id))
+    base_url = request.base_url
+
+    filenames = {}
+    cache_keys = {}
+    pending = []
+    used_names = set()
+
+    def unique_name(participant_id):
+        filename = filenames[participant_id]
+        if filename in used_names:
+            filename = filename.replace(".pdf", f"_{participant_id}.pdf")
+        used_names.add(filename)
+        return filename
+
+    def cached_pdf(participant_id):
+        path = pdf_cache.get_path(cache_keys[participant_id])
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as handle:
+                return handle.read()
+        except OSError:
+            return None
+
+    def html_jobs():
+        # Das HTML wird erst gerendert, wenn im Pool ein Platz frei ist.
+        for participant in pending:
+            yield participant["id"], _report_pdf_html(participant, group), base_url
+
+    def entries():
+        # Bereits gespeicherte Berichte werden direkt aus dem PDF-Cache übernommen.
+        for participant_id in participant_ids:
+            participant = db.get_participant_by_id(participant_id)
+            if not participant:
+                continue
+            filenames[participant_id] = _report_filename(participant)
+            cache_keys[participant_id] = _report_cache_key(participant, group)
+            pdf_bytes = cached_pdf(participant_id)
+            if pdf_bytes is None:
+                pending.append(participant)
+            else:
+                yield unique_name(participant_id), pdf_bytes
+
+        for participant_id, pdf_bytes, error in pdf_rendering.render_pdfs(html_jobs()):
+            filename = unique_name(participant_id)
+            if error is not None:
+                yield (filename.replace(".pdf", "_FEHLER.txt"),
+                       f"Der Bericht konnte nicht erzeugt werden: {error}".encode("utf-8"))
+            else:
+                pdf_cache.put(cache_keys[participant_id], pdf_bytes)
+                yield filename, pdf_bytes
+
+    safe_group = "".join(c for c in group["name"] if c.isalnum() or c in (' ', '_')).rstrip()
+    filename = f"Staerkenanalysen_{safe_group.replace(' ', '_')}.zip"
+    return Response(
+        stream_with_context(pdf_rendering.stream_zip(entries())),
+        mimetype="application/zip",
+        headers={"Content-disposition": f"attachment; filename=\"{filename}\""},
+    )
+
+
+# --- ASYNCHRONE PDF-JOBS ---
+
+def _submit_pdf_job(participants, group):
+    """
+    Legt einen Hintergrund-Job für die PDF-Berichte der Teilnehmer an. Das HTML
+    wird hier im Request gerendert, WeasyPrint läuft im Prozess-Pool.
+    """
+    base_url = request.base_url
+    tasks = []
+    for participant in participants:
+        cache_key = _report_cache_key(participant, group)
+        html_string = (None if pdf_cache.get_path(cache_key)
+                       else _report_pdf_html(participant, group))
+        tasks.append((_run_pdf_item, (participant["id"], cache_key, html_string, base_url)))
+    return submit_job(
+        "pdf_reports",
+        [p["id"] for p in participants],
+        tasks,
+        pool_name="pdf",
+        max_workers=pdf_rendering.PDF_WORKERS,
+        meta={"group_id": group["id"] if group else None,
+              "names": {str(p["id"]): p.get("name", "") for p in participants},
+              "filenames": {str(p["id"]): _report_filename(p) for p in participants},
+              "files": {}},
+    )
+
+
+def _run_pdf_item(job, participant_id, cache_key, html_string, base_url):
+    """Erzeugt den PDF-Bericht eines Teilnehmers im Hintergrund bzw. übernimmt ihn aus dem Cache."""
+    path = pdf_cache.get_path(cache_key)
+    if path is None:
+        if html_string is None:
+            raise RuntimeError("Bericht nicht mehr im PDF-Cache, bitte erneut anfordern.")
+        job.update_item(participant_id, "running", "PDF wird erzeugt...")
+        pdf_bytes = pdf_rendering.render_pdf_in_pool(html_string, base_url)
+        path = pdf_cache.put_job_result(cache_key, pdf_bytes)
+    job.meta["files"][str(participant_id)] = path
+    job.update_item(participant_id, "success")
+
+
+def _get_pdf_job(job_id):
+    job = get_job(job_id)
+    return job if job and job.kind == "pdf_reports" else None
+
+
+def prerender_report(app, participant_id):
+    """
+    Rendert den PDF-Bericht eines Teilnehmers vorab in den PDF-Cache (für
+    `pdf_prerender`). Gibt False zurück, wenn nichts zu tun war.
+    """
+    with app.app_context():
+        participant = db.get_participant_by_id(participant_id)
+        if not participant:
+            return False
+        group = db.get_group_by_id(participant['group_id'])
+        cache_key = _report_cache_key(participant, group)
+        if pdf_cache.get_path(cache_key) is not None:
+            return False
+        html_string = _report_pdf_html(participant, group)
+    pdf_cache.put(cache_key, pdf_rendering.render_pdf_in_pool(html_string))
+    return True
+
+
+@analysis_bp.route('/bericht/<int:participant_id>/pdf/job', methods=["POST"])
+def enqueue_report_pdf(participant_id):
+    """Startet die Erzeugung eines PDF-Berichts als Hintergrund-Job."""
+    participant = db.get_participant_by_id(participant_id)
+    if not participant:
+        return "Teilnehmer nicht gefunden", 404
+    job = _submit_pdf_job([participant], db.get_group_by_id(participant['group_id']))
+    return redirect(url_for("analysis.pdf_job_page", job_id=job.id))
+
+
+@analysis_bp.route('/gruppe/<int:group_id>/berichte/job', methods=["POST"])
+def enqueue_group_pdfs(group_id):
+    """Startet die Erzeugung der PDF-Berichte aller Teilnehmer einer Gruppe als Hintergrund-Job."""
+    group = db.get_group_by_id(group_id)
+    if not group:
+        return "Gruppe nicht gefunden", 404
+    participants = [db.get_participant_by_id(row["id"])
+                    for row in db.get_participants_by_group(group_id)]
+    participants = [p for p in participants if p]
+    if not participants:
+        flash("Die Gruppe enthält keine Teilnehmer.", "warning")
+        return redirect(url_for("groups.show_group_participants", group_id=group_id))
+    job = _submit_pdf_job(participants, group)
+    return redirect(url_for("analysis.pdf_job_page", job_id=job.id))
+
+
+@analysis_bp.route('/pdf_jobs/<job_id>')
+def pdf_job_page(job_id):
+    """Zeigt den Fortschritt eines PDF-Jobs mit Download-Links an."""
+    job = _get_pdf_job(job_id)
+    if not job:
+        flash("Der PDF-Auftrag wurde nicht gefunden oder ist abgelaufen.", "warning")
+        return redirect(url_for("dashboard"))
+    participants = [{"id": int(pid), "name": name} for pid, name in job.meta["names"].items()]
+    group = db.get_group_by_id(job.meta["group_id"]) if job.meta["group_id"] else None
+    breadcrumbs = [
+        {"link": url_for("dashboard"), "text": "Dashboard"},
+        {"text": "PDF-Erzeugung"},
+    ]
+    return render_template("pdf_job_status.html", job_id=job.id, participants=participants,
+                           group=group, breadcrumbs=breadcrumbs)
+
+
+@analysis_bp.route('/api/pdf_jobs/<job_id>')
+def pdf_job_status(job_id):
+    """Gibt den Fortschritt eines PDF-Jobs samt Download-URLs fertiger Berichte zurück."""
+    job = _get_pdf_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job nicht gefunden."}), 404
+    data = job.to_dict()
+    for participant_id, item in data["items"].items():
+        if item["status"] == "success":
+            item["download_url"] = url_for("analysis.pdf_job_download", job_id=job.id,
+                                           participant_id=int(participant_id))
+    return jsonify(data)
+
+
+@analysis_bp.route('/pdf_jobs/<job_id>/<int:participant_id>.pdf')
+def pdf_job_download(job_id, participant_id):
+    """Liefert einen fertigen Bericht eines PDF-Jobs aus."""
+    job = _get_pdf_job(job_id)
+    if not job:
+        return "Job nicht gefunden", 404
+    item = job.items.get(str(participant_id))
+    if item is None:
+        return "Bericht nicht Teil dieses Jobs", 404
+    if item["status"] != "success":
+        return "Bericht ist noch nicht fertig", 409
+    path = job.meta["files"].get(str(participant_id))
+    if not path or not os.path.exists(path):
+        return "Bericht ist nicht mehr verfügbar, bitte erneut anfordern", 410
+    return send_file(path, mimetype="application/pdf", as_attachment=True,
+                     download_name=job.meta["filenames"][str(participant_id)])
+
+
 # --- ROUTEN FÜR KI-ANALYSE (EINZELN & BATCH) ---
 
 @analysis_bp.route("/ai_analysis/select_group")
@@ -184,28 +455,75 @@ def configure_batch_ai_analysis():
         participants=participants,
         group=group,
         prompts=db.get_all_prompts(),
+        max_pack_size=prompt_rendering.MAX_PACK_SIZE,
         breadcrumbs=breadcrumbs,
     )
 
 
 @analysis_bp.route("/ai_analysis/execute", methods=["POST"])
 def execute_batch_ai_analysis():
-    """Zeigt den Status der KI-Analyse für ausgewählte Teilnehmer an."""
-    participant_ids = request.form.getlist("participant_ids")
+    """Startet die KI-Analyse als Hintergrund-Job und zeigt deren Status an."""
+    # Der Modellname bestimmt den Thread-Pool; unbekannte Namen würden neue Pools anlegen.
+    if not is_known_provider(request.form.get("ki_model", "mistral")):
+        return "Unbekanntes KI-Modell.", 400
+    participant_ids = [int(pid) for pid in request.form.getlist("participant_ids")
+                       if pid.isdigit()]
+    participants = [db.get_participant_by_id(pid) for pid in participant_ids]
+    participants = [p for p in participants if p]
+    if not participants:
+        flash("Keine Teilnehmer ausgewählt.", "warning")
+        return redirect(url_for("analysis.ai_analysis_select_group"))
+    group = db.get_group_by_id(participants[0]["group_id"])
+    if not group:
+        flash("Gruppe nicht gefunden.", "error")
+        return redirect(url_for("analysis.ai_analysis_select_group"))
+
+    # Die Vorlage wird vor dem Start geprüft, damit kein Job mit fehlerhaftem Prompt läuft.
+    try:
+        compiled = prompt_rendering.get_compiled_prompt(
+            request.form.get("ki_prompt", ""), request.form.get("prompt_id", type=int)
+        )
+    except prompt_rendering.PromptTemplateError as e:
+        flash(str(e), "error")
+        return redirect(url_for("analysis.ai_analysis_select_participants", group_id=group["id"]))
+
+    pack_size = min(max(1, request.form.get("pack_size", 1, type=int) or 1),
+                    prompt_rendering.MAX_PACK_SIZE)
+    if pack_size > 1 and not prompt_rendering.is_packable(compiled):
+        flash("Die Vorlage enthält teilnehmerbezogene Platzhalter außerhalb von {{context}}; "
+              "die Analysen werden einzeln ausgeführt.", "warning")
+        pack_size = 1
+
+    rerun_mode = request.form.get("rerun_mode", "all")
+    if rerun_mode not in RERUN_MODES:
+        rerun_mode = "all"
+
     analysis_data = {
         "prompt_template": request.form.get("ki_prompt", ""),
+        "prompt_id": request.form.get("prompt_id", type=int),
         "ki_model": request.form.get("ki_model", "mistral"),
-        "additional_content": "\n\n---\n\n".join(
-            [
-                get_file_content(file)
-                for file in request.files.getlist("additional_files")
-                if file and file.filename != ""
-            ]
-        ),
+        "use_cache": request.form.get("bypass_cache") != "on",
+        "attachment_ids": _store_uploaded_attachments(),
+        "rerun_mode": rerun_mode,
     }
 
-    participants = [db.get_participant_by_id(pid) for pid in participant_ids]
-    group = db.get_group_by_id(participants[0]["group_id"]) if participants else None
+    ki_model = analysis_data["ki_model"]
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    item_ids = [p["id"] for p in participants]
+    if pack_size > 1:
+        tasks = [(_run_batch_pack, (item_ids[i:i + pack_size], app, analysis_data))
+                 for i in range(0, len(item_ids), pack_size)]
+    else:
+        tasks = [(_run_batch_item, (pid, app, analysis_data)) for pid in item_ids]
+    job = submit_job(
+        "ai_analysis",
+        item_ids,
+        tasks,
+        pool_name=f"ki-{ki_model}",
+        max_workers=get_provider_concurrency(ki_model),
+        meta={"group_id": group["id"], "ki_model": ki_model, "pack_size": pack_size,
+              "rerun_mode": rerun_mode},
+    )
 
     breadcrumbs = [
         {"link": url_for("dashboard"), "text": "Dashboard"},
@@ -217,48 +535,142 @@ def execute_batch_ai_analysis():
         "ai_analysis_status.html",
         participants=participants,
         group=group,
-        analysis_data=analysis_data,
+        job_id=job.id,
         breadcrumbs=breadcrumbs,
     )
 
 
-# --- API-Endpunkte für die KI ---
+def _uploaded_files():
+    return [file for file in request.files.getlist("additional_files")
+            if file and file.filename != ""]
 
-@analysis_bp.route("/run_ki_analysis/<int:participant_id>", methods=["POST"])
-def run_ki_analysis(participant_id):
-    """Führt die KI-Analyse für einen einzelnen Teilnehmer durch (aus der Dateneingabe)."""
-    participant = db.get_participant_by_id(participant_id)
-    final_prompt = request.form.get("ki_prompt", "")
-    ki_model = request.form.get("ki_model", "mistral")
 
-    full_name = participant.get("name", "")
-    first_name = full_name.split(" ")[0] if full_name else ""
+def _store_uploaded_attachments():
+    """Extrahiert hochgeladene Zusatzdateien parallel und legt sie im Anhangspeicher ab."""
+    return [attachments.store_attachment(content)
+            for content in get_files_content(_uploaded_files())]
+
 
-    final_prompt = final_prompt.replace("{{name}}", first_name).replace("{{vorname}}", first_name)
+@analysis_bp.route("/api/attachments", methods=["POST"])
+def upload_attachments():
+    """Speichert hochgeladene Dateien serverseitig und gibt ihre Anhang-IDs zurück."""
+    return jsonify({"status": "success", "attachment_ids": _store_uploaded_attachments()})
 
-    observations = participant.get("observations", {})
-    social_obs = observations.get("social", "")
-    verbal_obs = observations.get("verbal", "")
-    final_prompt = final_prompt.replace(
-        "{{social_observations}}", social_obs
-    ).replace(
-        "{{verbal_observations}}", verbal_obs
+
+def _run_batch_item(job, participant_id, app, analysis_data):
+    """Führt die Analyse für einen Teilnehmer eines Batch-Jobs im Hintergrund aus."""
+    job.update_item(participant_id, "running", "Wird analysiert...")
+    with app.app_context():
+        result = _analyze_participant(participant_id, analysis_data)
+    job.update_item(participant_id, result["status"], result["message"])
+
+
+def _run_batch_pack(job, participant_ids, app, analysis_data):
+    """Führt die Analyse für ein Paket von Teilnehmern in einer gemeinsamen Anfrage aus."""
+    for participant_id in participant_ids:
+        job.update_item(participant_id, "running",
+                        f"Wird im Paket mit {len(participant_ids)} Teilnehmern analysiert...")
+    with app.app_context():
+        results = _analyze_pack(participant_ids, analysis_data)
+    for participant_id, result in results.items():
+        job.update_item(participant_id, result["status"], result["message"])
+
+
+@analysis_bp.route("/ai_calls")
+def ai_calls_dashboard():
+    """Zeigt Antwortzeiten, Durchsatz und Fehler der KI-Aufrufe je Provider an."""
+    days = min(max(request.args.get("days", 14, type=int) or 14, 1), 365)
+    breadcrumbs = [
+        {"link": url_for("dashboard"), "text": "Dashboard"},
+        {"text": "KI-Aufrufe"},
+    ]
+    return render_template(
+        "ai_calls_dashboard.html",
+        summary=ai_ledger.summarize_calls(days),
+        breadcrumbs=breadcrumbs,
     )
 
+
+@analysis_bp.route("/api/ai_calls")
+def ai_calls_summary():
+    """Gibt die Auswertung der KI-Aufrufe als JSON zurück."""
+    days = min(max(request.args.get("days", 14, type=int) or 14, 1), 365)
+    return jsonify(ai_ledger.summarize_calls(days))
+
+
+@analysis_bp.route("/api/ki_hedging_stats")
+def ki_hedging_stats():
+    """Gibt Antwortzeiten, Fristen und Ergebnisse des Hedgings je Provider zurück."""
+    return jsonify(ki_hedging.stats())
+
+
+@analysis_bp.route("/api/ki_circuit_stats")
+def ki_circuit_stats():
+    """Gibt den Zustand der Circuit Breaker je Provider und Modell zurück."""
+    return jsonify(ki_circuit.stats())
+
+
+@analysis_bp.route("/api/cache_stats")
+def cache_stats():
+    """Gibt die Kennzahlen der Caches (Treffer, Fehlzugriffe, Größe) zurück."""
+    return jsonify({
+        "ki_cache": ki_cache.stats(),
+        "attachments": attachments.stats(),
+        "extracted_text": extraction_cache_stats(),
+        "charts": charts.stats(),
+        "pdf_reports": pdf_cache.stats(),
+        "pdf_prerender": pdf_prerender.stats(),
+    })
+
+
+@analysis_bp.route("/api/ai_analysis/jobs/<job_id>")
+def ai_analysis_job_status(job_id):
+    """Gibt den Fortschritt eines KI-Batch-Jobs pro Teilnehmer zurück."""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job nicht gefunden."}), 404
+    return jsonify(job.to_dict())
+
+
+# --- API-Endpunkte für die KI ---
+
+def _build_form_prompt(participant):
+    """
+    Setzt den Prompt aus dem Formular mit den Daten des Teilnehmers zusammen und
+    gibt ihn mit dem Fingerabdruck der Eingaben zurück. Wirft einen
+    PromptTemplateError bei fehlerhafter Vorlage.
+    """
+    compiled = prompt_rendering.get_compiled_prompt(
+        request.form.get("ki_prompt", ""), request.form.get("prompt_id", type=int)
+    )
     additional_content = ""
-    if "additional_files" in request.files:
-        file = request.files.get("additional_files")
-        if file and file.filename != "":
-            additional_content = get_file_content(file)
-    final_prompt = final_prompt.replace("{{additional_content}}", additional_content)
+    # Zusatzdateien werden nur extrahiert, wenn die Vorlage sie auch verwendet.
+    if compiled.uses("additional_content", "context"):
+        additional_content = attachments.ATTACHMENT_SEPARATOR.join(
+            get_files_content(_uploaded_files())
+        )
+    ki_model = request.form.get("ki_model", "mistral")
+    fingerprint = prompt_rendering.input_fingerprint(
+        compiled, participant, additional_content, model_identity(ki_model)
+    )
+    prompt = prompt_rendering.render_for_participant(
+        compiled, participant, additional_content, ki_model
+    )
+    return prompt, fingerprint
 
-    ki_response_str = generate_report_with_ai(final_prompt, ki_model)
-    db.save_ki_raw_response(participant_id, ki_response_str)
 
+def _persist_ki_response(participant_id, response_str, fingerprint=None):
+    """
+    Speichert die rohe KI-Antwort und – falls gültig – die daraus gelesenen
+    Bewertungen und Texte sowie den Fingerabdruck der Eingaben. Gibt ein
+    Dictionary mit `status` und `message` zurück.
+    """
+    db.save_ki_raw_response(participant_id, response_str)
     try:
-        ki_data = json.loads(clean_json_response(ki_response_str))
+        ki_data = json.loads(clean_json_response(response_str))
         if "error" in ki_data:
-            return jsonify({"status": "error", "message": f"KI-Fehler: {ki_data['error']}"})
+            db.save_ki_analysis_state(participant_id, "error")
+            return {"status": "error", "message": f"KI-Fehler: {ki_data['error']}"}
 
         db.save_participant_data(
             participant_id,
@@ -268,60 +680,268 @@ def run_ki_analysis(participant_id):
                 "ki_texts": ki_data.get("ki_texts", {}),
             },
         )
-        return jsonify({
-            "status": "success",
-            "message": "KI-Analyse erfolgreich. Bericht wird geladen...",
-            "redirect_url": url_for("participants.show_report", participant_id=participant_id),
-        })
+        pdf_cache.invalidate_participant(participant_id)
+        db.save_ki_analysis_state(participant_id, "success", fingerprint)
+        return {"status": "success", "message": "Analyse erfolgreich."}
     except json.JSONDecodeError as e:
-        return jsonify({
+        db.save_ki_analysis_state(participant_id, "error")
+        return {
             "status": "error",
-            "message": f"Fehler beim Verarbeiten der KI-Antwort: {e}",
-            "raw_response": ki_response_str,
-        })
+            "message": f"Formatfehler: {e}",
+            "raw_response": response_str,
+        }
 
 
-@analysis_bp.route("/api/run_single_analysis/<int:participant_id>", methods=["POST"])
-def run_single_analysis_api(participant_id):
-    """API-Endpunkt, um die KI-Analyse für die Batch-Verarbeitung auszuführen."""
-    data = request.get_json()
+def _split_packed_response(response_str, participant_ids):
+    """
+    Zerlegt die Antwort einer Sammelanfrage in die Ergebnisse je Teilnehmer.
+    Gibt ein Dictionary `{participant_id: ergebnis}` der gültigen Einträge und
+    eine Fehlerbeschreibung (oder None) zurück.
+    """
+    try:
+        data = json.loads(clean_json_response(response_str))
+    except json.JSONDecodeError as e:
+        return {}, f"Formatfehler: {e}"
+    if isinstance(data, dict):
+        if "error" in data:
+            return {}, f"KI-Fehler: {data['error']}"
+        data = data.get("results")
+    if not isinstance(data, list):
+        return {}, "Die Antwort enthält keine Liste 'results'."
+
+    expected = set(participant_ids)
+    entries = {}
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            participant_id = int(entry.get("participant_id"))
+        except (TypeError, ValueError):
+            continue
+        if participant_id not in expected or participant_id in entries:
+            continue
+        if not all(isinstance(entry.get(key), dict)
+                   for key in ("sk_ratings", "vk_ratings", "ki_texts")):
+            continue
+        entries[participant_id] = {key: entry[key]
+                                   for key in ("sk_ratings", "vk_ratings", "ki_texts")}
+    missing = sorted(expected - set(entries))
+    if missing:
+        return entries, f"Keine gültigen Ergebnisse für Teilnehmer {missing}."
+    return entries, None
+
+
+def _sse_event(event, data):
+    """Formatiert ein Server-Sent-Event mit JSON-Nutzdaten."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@analysis_bp.route("/run_ki_analysis/<int:participant_id>/stream", methods=["POST"])
+def stream_ki_analysis(participant_id):
+    """
+    Führt die KI-Analyse für einen einzelnen Teilnehmer aus und überträgt die
+    Antwort während der Generierung per Server-Sent Events an den Browser.
+    Nach Abschluss wird das Ergebnis wie bei `run_ki_analysis` gespeichert.
+    """
+    participant = db.get_participant_by_id(participant_id)
+    if not participant:
+        return jsonify({"status": "error", "message": "Teilnehmer nicht gefunden."}), 404
+    ki_model = request.form.get("ki_model", "mistral")
+    if not is_known_provider(ki_model):
+        return jsonify({"status": "error", "message": "Unbekanntes KI-Modell."}), 400
+    use_cache = request.form.get("bypass_cache") != "on"
+    try:
+        final_prompt, fingerprint = _build_form_prompt(participant)
+    except prompt_rendering.PromptTemplateError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    def generate():
+        parts = []
+        yield _sse_event("start", {"ki_model": ki_model})
+        try:
+            for chunk in stream_report_with_ai(final_prompt, ki_model, use_cache=use_cache,
+                                               participant_id=participant_id):
+                parts.append(chunk)
+                yield _sse_event("chunk", {"text": chunk})
+            result = _persist_ki_response(participant_id, "".join(parts), fingerprint)
+        except Exception as e:  # pylint: disable=broad-except
+            # Jeder Fehler muss beim Client ankommen, sonst wartet dieser auf "done".
+            print(f"WARNUNG: Streaming-Analyse für Teilnehmer {participant_id} abgebrochen: {e}")
+            error_str = json.dumps({"error": f"Ein Fehler ist aufgetreten: {str(e)}"})
+            db.save_ki_raw_response(participant_id, error_str)
+            db.save_ki_analysis_state(participant_id, "error")
+            yield _sse_event("error", {"status": "error", "message": f"KI-Fehler: {e}"})
+            return
+
+        if result["status"] == "success":
+            result["redirect_url"] = url_for(
+                "participants.show_report", participant_id=participant_id
+            )
+        yield _sse_event("done", result)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@analysis_bp.route("/run_ki_analysis/<int:participant_id>", methods=["POST"])
+def run_ki_analysis(participant_id):
+    """Führt die KI-Analyse für einen einzelnen Teilnehmer durch (aus der Dateneingabe)."""
     participant = db.get_participant_by_id(participant_id)
     if not participant:
         return jsonify({"status": "error", "message": "Teilnehmer nicht gefunden."}), 404
+    ki_model = request.form.get("ki_model", "mistral")
+    if not is_known_provider(ki_model):
+        return jsonify({"status": "error", "message": "Unbekanntes KI-Modell."}), 400
+    try:
+        final_prompt, fingerprint = _build_form_prompt(participant)
+    except prompt_rendering.PromptTemplateError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    use_cache = request.form.get("bypass_cache") != "on"
+    ki_response_str = generate_report_with_ai(final_prompt, ki_model, use_cache=use_cache,
+                                              participant_id=participant_id)
+    result = _persist_ki_response(participant_id, ki_response_str, fingerprint)
+    if result["status"] == "success":
+        result["redirect_url"] = url_for("participants.show_report", participant_id=participant_id)
+    return jsonify(result)
+
+
+def _skip_reason(participant, fingerprint, rerun_mode):
+    """Gibt zurück, warum ein Teilnehmer im gewählten Modus übersprungen wird (oder None)."""
+    status = participant.get("ki_analysis_status")
+    if rerun_mode == "failed" and status != "error":
+        return ("Letzte Analyse war erfolgreich." if status == "success"
+                else "Keine fehlgeschlagene Analyse vorhanden.")
+    if rerun_mode == "changed" and status == "success" \
+            and participant.get("ki_input_fingerprint") == fingerprint:
+        return "Eingaben seit der letzten erfolgreichen Analyse unverändert."
+    return None
+
+
+def _analyze_participant(participant_id, analysis_data, force=False):
+    """
+    Führt die KI-Analyse für einen Teilnehmer aus und speichert das Ergebnis.
+    Je nach `rerun_mode` werden unveränderte bzw. nicht fehlgeschlagene
+    Teilnehmer übersprungen, außer bei `force`. Gibt ein Dictionary mit
+    `status` und `message` zurück.
+    """
+    participant = db.get_participant_by_id(participant_id)
+    if not participant:
+        return {"status": "error", "message": "Teilnehmer nicht gefunden."}
 
-    full_name = participant.get("name", "")
-    first_name = full_name.split(" ")[0] if full_name else ""
-    obs = participant.get("observations", {})
+    ki_model = analysis_data.get("ki_model")
+    # PromptTemplateError ist ein ValueError, ebenso wie fehlende Anhänge.
+    try:
+        compiled = prompt_rendering.get_compiled_prompt(
+            analysis_data.get("prompt_template"), analysis_data.get("prompt_id")
+        )
+        additional_content = analysis_data.get("additional_content") or (
+            attachments.resolve_attachments(analysis_data.get("attachment_ids"))
+        )
+        fingerprint = prompt_rendering.input_fingerprint(
+            compiled, participant, additional_content, model_identity(ki_model)
+        )
+        skip_reason = None if force else _skip_reason(
+            participant, fingerprint, analysis_data.get("rerun_mode", "all")
+        )
+        if skip_reason:
+            return {"status": "skipped", "message": skip_reason}
+        prompt = prompt_rendering.render_for_participant(
+            compiled, participant, additional_content, ki_model
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
 
-    context_block = (
-        f"ANALYSE-SUBJEKT:\n- Vorname: {first_name}\n- Ganzer Name: {full_name}\n\n"
-        f"BEOBACHTUNGEN ZUM VERHALTEN:\n- Soziale Kompetenzen: {obs.get('social', '')}\n"
-        f"- Verbale Kompetenzen: {obs.get('verbal', '')}\n\n"
-        f"ZUSÄTZLICHER KONTEXT:\n{data.get('additional_content', '')}"
+    response_str = generate_report_with_ai(
+        prompt, ki_model, use_cache=analysis_data.get("use_cache", True),
+        participant_id=participant_id,
     )
+    return _persist_ki_response(participant_id, response_str, fingerprint)
 
-    prompt = data.get("prompt_template", "").replace("{{context}}", context_block)
 
-    response_str = generate_report_with_ai(prompt, data.get("ki_model"))
-    db.save_ki_raw_response(participant_id, response_str)
+def _analyze_pack(participant_ids, analysis_data):
+    """
+    Analysiert mehrere Teilnehmer mit einer gemeinsamen KI-Anfrage und speichert
+    die Ergebnisse einzeln. Teilnehmer ohne gültiges Ergebnis in der Sammelantwort
+    werden einzeln nachanalysiert; je nach `rerun_mode` übersprungene Teilnehmer
+    werden nicht in das Paket aufgenommen. Gibt `{participant_id: status}` zurück.
+    """
+    participants = [db.get_participant_by_id(pid) for pid in participant_ids]
+    participants = [p for p in participants if p]
+    results = {pid: {"status": "error", "message": "Teilnehmer nicht gefunden."}
+               for pid in participant_ids}
+    if not participants:
+        return results
 
     try:
-        ki_data = json.loads(clean_json_response(response_str))
-        if "error" in ki_data:
-            return jsonify({"status": "error", "message": f"KI-Fehler: {ki_data['error']}"})
+        compiled = prompt_rendering.get_compiled_prompt(
+            analysis_data.get("prompt_template"), analysis_data.get("prompt_id")
+        )
+        additional_content = analysis_data.get("additional_content") or (
+            attachments.resolve_attachments(analysis_data.get("attachment_ids"))
+        )
+    except ValueError as e:
+        for participant in participants:
+            results[participant["id"]] = {"status": "error", "message": str(e)}
+        return results
+
+    identity = model_identity(analysis_data.get("ki_model"))
+    fingerprints = {}
+    pending = []
+    for participant in participants:
+        fingerprint = prompt_rendering.input_fingerprint(
+            compiled, participant, additional_content, identity
+        )
+        skip_reason = _skip_reason(participant, fingerprint, analysis_data.get("rerun_mode", "all"))
+        if skip_reason:
+            results[participant["id"]] = {"status": "skipped", "message": skip_reason}
+        else:
+            fingerprints[participant["id"]] = fingerprint
+            pending.append(participant)
+    participants = pending
+    if not participants:
+        return results
 
-        db.save_participant_data(
-            participant_id,
-            {
-                "sk_ratings": ki_data.get("sk_ratings", {}),
-                "vk_ratings": ki_data.get("vk_ratings", {}),
-                "ki_texts": ki_data.get("ki_texts", {}),
-            },
+    try:
+        prompt = prompt_rendering.render_packed(
+            compiled, participants, additional_content, analysis_data.get("ki_model")
         )
-        return jsonify({"status": "success", "message": "Analyse erfolgreich."})
-    except json.JSONDecodeError as e:
-        return jsonify({
-            "status": "error",
-            "message": f"Formatfehler: {e}",
-            "raw_response": response_str,
-        })
+    except ValueError as e:
+        for participant in participants:
+            results[participant["id"]] = {"status": "error", "message": str(e)}
+        return results
+
+    response_str = generate_report_with_ai(
+        prompt, analysis_data.get("ki_model"), use_cache=analysis_data.get("use_cache", True)
+    )
+    entries, problem = _split_packed_response(response_str, [p["id"] for p in participants])
+    if problem:
+        print(f"WARNUNG: Sammelantwort unvollständig ({problem}) – Einzelaufrufe als Ersatz.")
+
+    for participant in participants:
+        participant_id = participant["id"]
+        entry = entries.get(participant_id)
+        if entry is None:
+            result = _analyze_participant(participant_id, analysis_data, force=True)
+            if result["status"] == "success":
+                result["message"] = ("Analyse erfolgreich "
+                                     "(Einzelaufruf nach ungültiger Sammelantwort).")
+        else:
+            result = _persist_ki_response(participant_id, json.dumps(entry, ensure_ascii=False),
+                                          fingerprints[participant_id])
+            if result["status"] == "success":
+                result["message"] = ("Analyse erfolgreich (Sammelanfrage mit "
+                                     f"{len(participants)} Teilnehmern).")
+        results[participant_id] = result
+    return results
+
+
+@analysis_bp.route("/api/run_single_analysis/<int:participant_id>", methods=["POST"])
+def run_single_analysis_api(participant_id):
+    """API-Endpunkt, um die KI-Analyse für einen einzelnen Teilnehmer auszuführen."""
+    if not db.get_participant_by_id(participant_id):
+        return jsonify({"status": "error", "message": "Teilnehmer nicht gefunden."}), 404
+    return jsonify(_analyze_participant(participant_id, request.get_json() or {}))
@@ -5,7 +5,6 @@ import json
 import csv
 from datetime import UTC, datetime
 from io import BytesIO, StringIO
-import pandas as pd
 
 from flask import (Blueprint, request, redirect, url_for, flash, render_template,
                    Response)
@@ -77,6 +76,8 @@ def _create_participant_export_dict(p):
 
 def generate_excel_export(participants_data):
     """Generiert eine Excel-Datei aus den Teilnehmerdaten."""
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
     export_data = [_create_participant_export_dict(p) for p in participants_data]
     df = pd.DataFrame(export_data)
     output = BytesIO()
@@ -151,6 +152,8 @@ def import_full():
         flash("Bitte wählen Sie eine Datei aus.", "warning")
         return redirect(url_for("data_io.import_page"))
     try:
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
         if file.filename.endswith(".xlsx"):
             df = pd.read_excel(file)
         elif file.filename.endswith(".csv"):
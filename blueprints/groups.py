@@ -3,6 +3,7 @@
 
 from flask import Blueprint, request, redirect, url_for, flash, render_template
 import database as db
+import pdf_cache
 
 # Ein Blueprint-Objekt erstellen, das als unsere "Fachabteilung" dient
 groups_bp = Blueprint('groups', __name__)
@@ -70,12 +71,16 @@ def edit_group(group_id):
         "beobachter2": request.form.get("beobachter2"),
     }
     db.update_group_details(group_id, details)
+    # Gruppendaten stehen in jedem Bericht der Gruppe.
+    pdf_cache.invalidate_group(p["id"] for p in db.get_participants_by_group(group_id))
     flash("Gruppe erfolgreich aktualisiert.", "success")
     return redirect(url_for("groups.manage_groups"))
 
 @groups_bp.route("/group/delete/<int:group_id>", methods=["POST"])
 def delete_group(group_id):
     """Entfernt eine Gruppe und alle zugehörigen Teilnehmer."""
+    participant_ids = [p["id"] for p in db.get_participants_by_group(group_id)]
     db.delete_group_by_id(group_id)
+    pdf_cache.invalidate_group(participant_ids)
     flash("Gruppe und alle zugehörigen Teilnehmer wurden gelöscht.", "success")
     return redirect(url_for("groups.manage_groups"))
@@ -3,8 +3,12 @@
 
 from datetime import datetime
 import pytz
-from flask import Blueprint, request, redirect, url_for, flash, render_template, jsonify
+from flask import (Blueprint, request, redirect, url_for, flash, render_template, jsonify,
+                   current_app)
 import database as db
+import pdf_cache
+import pdf_prerender
+from blueprints.analysis import prerender_report
 
 participants_bp = Blueprint('participants', __name__)
 
@@ -50,6 +54,7 @@ def edit_participant(participant_id):
     group_id = request.form["group_id"]
     if new_name:
         db.update_participant_name(participant_id, new_name)
+        pdf_cache.invalidate_participant(participant_id)
         flash("Teilnehmername wurde aktualisiert.", "success")
     return redirect(url_for("groups.show_group_participants", group_id=group_id))
 
@@ -59,6 +64,7 @@ def delete_participant(participant_id):
     """Löscht einen Teilnehmer."""
     group_id = request.form["group_id"]
     db.delete_participant_by_id(participant_id)
+    pdf_cache.invalidate_participant(participant_id)
     flash("Teilnehmer wurde gelöscht.", "success")
     return redirect(url_for("groups.show_group_participants", group_id=group_id))
 
@@ -144,6 +150,7 @@ def save_observations(participant_id):
     data = request.get_json()
     if data and "social" in data:
         db.save_participant_data(participant_id, {"observations": data})
+        pdf_cache.invalidate_participant(participant_id)
         return jsonify({"status": "success", "message": "Beobachtungen gespeichert!"})
     return jsonify({"status": "error", "message": "Ungültige Daten."}), 400
 
@@ -163,6 +170,11 @@ def save_report(participant_id):
     db.save_report_details(
         participant_id, data.get("group_details"), data.get("footer_data")
     )
+    pdf_cache.invalidate_participant(participant_id)
+    # Der PDF-Bericht wird kurz nach dem letzten Speichern vorab erzeugt (PDF_PRERENDER=1).
+    pdf_prerender.schedule(participant_id, prerender_report,
+                           current_app._get_current_object(),  # pylint: disable=protected-access
+                           participant_id)
     return jsonify({"status": "success", "message": "Bericht erfolgreich gespeichert!"})
 
 
@@ -172,6 +184,28 @@ def get_participants_for_group(group_id):
     participants = db.get_participants_by_group(group_id)
     return jsonify([dict(p) for p in participants])
 
+
+@participants_bp.route("/api/group/<int:group_id>/ratings")
+def get_group_ratings(group_id):
+    """
+    Gibt Durchschnittsbewertungen je Kompetenz und die Zahl bewerteter
+    Teilnehmer einer Gruppe zurück.
+    """
+    return jsonify({
+        "averages": db.get_group_rating_averages(group_id),
+        "rated_participants": db.get_rated_participant_counts(group_id).get(group_id, 0),
+    })
+
+
+@participants_bp.route("/api/ratings/distribution")
+def get_rating_distribution():
+    """Gibt die Verteilung aller Bewertungen und die bewerteten Teilnehmer je Gruppe zurück."""
+    return jsonify({
+        "distribution": db.get_rating_distribution(),
+        "rated_participants_by_group": db.get_rated_participant_counts(),
+    })
+
+
 @participants_bp.route("/api/participant/<int:participant_id>/observations")
 def get_observations(participant_id):
     """Gibt die Beobachtungen für einen Teilnehmer als JSON zurück."""
@@ -0,0 +1,243 @@
+"""
+Dieses Modul erzeugt die Radardiagramme für Berichte und PDFs.
+
+Standardmäßig werden die Diagramme ohne zusätzliche Bibliotheken direkt als
+SVG gezeichnet (`PDF_CHART_FORMAT=svg`); das Aussehen entspricht dem früheren
+Matplotlib-Diagramm. Mit `PDF_CHART_FORMAT=png` wird weiterhin Matplotlib
+verwendet.
+
+Bewertungen bestehen nur aus wenigen Werten zwischen 0 und 10, daher haben
+viele Teilnehmer identische Diagramme, und dasselbe Diagramm wird bei jedem
+Download erneut benötigt. Fertige Diagramme werden deshalb in einem begrenzten
+LRU-Cache im Speicher und optional zusätzlich auf der Festplatte abgelegt. Der
+Schlüssel umfasst Format, Achsen, Werte, Beschriftungen, Farbe und `STYLE_VERSION`.
+"""
+
+import base64
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from disk_cache import DiskCache
+
+# Bei Änderungen am Aussehen der Diagramme erhöhen, damit alte Cache-Einträge verfallen.
+STYLE_VERSION = 1
+PDF_CHART_FORMAT = os.getenv("PDF_CHART_FORMAT", "svg").lower()
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "256"))
+CHART_DISK_CACHE_ENABLED = os.getenv("CHART_DISK_CACHE", "0").lower() in ("1", "true", "yes", "on")
+CHART_DISK_CACHE_MAX_BYTES = int(os.getenv("CHART_DISK_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Abmessungen des SVG-Diagramms (Einheiten der viewBox).
+SVG_WIDTH = 720
+SVG_HEIGHT = 540
+SVG_RADIUS = 200
+SVG_LABEL_PAD = 24
+SVG_FONT_SIZE = 17
+SVG_LINE_HEIGHT = 20
+MAX_RATING = 10
+GRID_STEPS = (2, 4, 6, 8)
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+_memory_stats = {"hits": 0, "misses": 0, "evictions": 0, "renders": 0}
+_disk_cache = (DiskCache("charts", max_bytes=CHART_DISK_CACHE_MAX_BYTES, suffix=".txt")
+               if CHART_DISK_CACHE_ENABLED else None)
+
+
+def chart_cache_key(keys, values, labels, color, chart_format=PDF_CHART_FORMAT):
+    """
+    Schlüssel eines Diagramms: SHA-256 über Format, Achsen, Werte,
+    Beschriftungen, Farbe und Stil.
+    """
+    payload = json.dumps([STYLE_VERSION, chart_format, list(keys), list(values),
+                          list(labels), color],
+                         ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _memory_get(cache_key):
+    with _memory_lock:
+        chart = _memory_cache.get(cache_key)
+        if chart is None:
+            _memory_stats["misses"] += 1
+            return None
+        _memory_cache.move_to_end(cache_key)
+        _memory_stats["hits"] += 1
+        return chart
+
+
+def _memory_put(cache_key, chart):
+    with _memory_lock:
+        _memory_cache[cache_key] = chart
+        _memory_cache.move_to_end(cache_key)
+        while len(_memory_cache) > CHART_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+            _memory_stats["evictions"] += 1
+
+
+def _render_radar_png(values, labels, color):
+    """Zeichnet das Radardiagramm mit Matplotlib und gibt es als PNG-Data-URI zurück."""
+    # Matplotlib und NumPy werden erst beim ersten Diagramm geladen.
+    # pylint: disable=import-outside-toplevel
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    values = list(values)
+    num_vars = len(labels)
+    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
+    values_plot = values + values[:1]
+    angles_plot = angles + angles[:1]
+
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw={"polar": True})
+    ax.fill(angles_plot, values_plot, color=color, alpha=0.2)
+    ax.plot(angles_plot, values_plot, color=color, linewidth=2)
+    ax.grid(color='#E0E0E0', linestyle='-', linewidth=0.7)
+    ax.spines['polar'].set_edgecolor('#E0E0EE')
+    ax.set_yticklabels([])
+    ax.set_rlim(0, 10)
+    ax.set_xticks(angles)
+    ax.set_xticklabels(labels, size=12, fontfamily='sans-serif')
+    ax.set_theta_offset(np.pi / 2)
+    ax.set_theta_direction(-1)
+    ax.tick_params(axis='x', pad=15)
+
+    buf = BytesIO()
+    plt.savefig(buf, format='png', bbox_inches='tight', transparent=True, pad_inches=0.2)
+    plt.close(fig)
+    buf.seek(0)
+
+    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
+    return f"data:image/png;base64,{img_base64}"
+
+
+def _rating(value):
+    """Wandelt eine Bewertung in eine Zahl zwischen 0 und `MAX_RATING` um."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if math.isnan(value):
+        return 0.0
+    return min(max(value, 0.0), MAX_RATING)
+
+
+def _point(angle, radius):
+    cx, cy = SVG_WIDTH / 2, SVG_HEIGHT / 2
+    return cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+
+
+def _svg_label(angle, label):
+    """Setzt eine (ggf. mehrzeilige) Achsenbeschriftung außerhalb des Kreises."""
+    x, y = _point(angle, SVG_RADIUS + SVG_LABEL_PAD)
+    cos, sin = math.cos(angle), math.sin(angle)
+    anchor = "start" if cos > 0.3 else "end" if cos < -0.3 else "middle"
+    lines = str(label).split("\n")
+    if sin < -0.5:
+        first_y = y - (len(lines) - 1) * SVG_LINE_HEIGHT
+    elif sin > 0.5:
+        first_y = y + SVG_FONT_SIZE * 0.8
+    else:
+        first_y = y - (len(lines) - 1) * SVG_LINE_HEIGHT / 2 + SVG_FONT_SIZE * 0.35
+    tspans = "".join(
+        f'<tspan x="{x:.1f}" y="{first_y + index * SVG_LINE_HEIGHT:.1f}">{escape(line)}</tspan>'
+        for index, line in enumerate(lines)
+    )
+    return f'<text text-anchor="{anchor}">{tspans}</text>'
+
+
+def render_radar_svg(values, labels, color):
+    """
+    Zeichnet das Radardiagramm als SVG-Markup: erste Achse oben, im
+    Uhrzeigersinn, Skala 0 bis 10 mit Gitterkreisen wie im Matplotlib-Diagramm.
+    """
+    count = len(labels)
+    angles = [-math.pi / 2 + 2 * math.pi * index / count for index in range(count)]
+    cx, cy = SVG_WIDTH / 2, SVG_HEIGHT / 2
+    color = escape(str(color), {'"': "&quot;"})
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+        f'width="{SVG_WIDTH}" height="{SVG_HEIGHT}" '
+        f'font-family="sans-serif" font-size="{SVG_FONT_SIZE}" fill="#262626">'
+    ]
+    for step in GRID_STEPS:
+        parts.append(f'<circle cx="{cx}" cy="{cy}" r="{SVG_RADIUS * step / MAX_RATING:.1f}" '
+                     'fill="none" stroke="#E0E0E0" stroke-width="0.7"/>')
+    for angle in angles:
+        x, y = _point(angle, SVG_RADIUS)
+        parts.append(f'<line x1="{cx}" y1="{cy}" x2="{x:.1f}" y2="{y:.1f}" '
+                     'stroke="#E0E0E0" stroke-width="0.7"/>')
+    parts.append(f'<circle cx="{cx}" cy="{cy}" r="{SVG_RADIUS}" fill="none" '
+                 'stroke="#E0E0EE" stroke-width="1"/>')
+
+    points = " ".join(
+        "{:.1f},{:.1f}".format(*_point(angle, SVG_RADIUS * _rating(value) / MAX_RATING))
+        for angle, value in zip(angles, values)
+    )
+    parts.append(f'<polygon points="{points}" fill="{color}" fill-opacity="0.2" '
+                 f'stroke="{color}" stroke-width="2" stroke-linejoin="round"/>')
+    parts.extend(_svg_label(angle, label) for angle, label in zip(angles, labels))
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _render_radar_svg(values, labels, color):
+    svg = render_radar_svg(values, labels, color)
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode("utf-8")).decode("ascii")
+
+
+def create_radar_chart(ratings_dict, keys, labels, color, chart_format=None):
+    """
+    Gibt ein Radardiagramm als Data-URI zurück – als SVG oder, mit
+    `chart_format="png"`, als mit Matplotlib gezeichnetes PNG (Standard:
+    `PDF_CHART_FORMAT`). Bereits erzeugte Diagramme werden aus dem Speicher-
+    bzw. Festplatten-Cache geliefert.
+    """
+    chart_format = chart_format or PDF_CHART_FORMAT
+    values = tuple(ratings_dict.get(key, 0) for key in keys)
+    cache_key = chart_cache_key(keys, values, labels, color, chart_format)
+
+    chart = _memory_get(cache_key)
+    if chart is not None:
+        return chart
+    if _disk_cache is not None:
+        data = _disk_cache.get(cache_key)
+        if data is not None:
+            chart = data.decode("utf-8")
+            _memory_put(cache_key, chart)
+            return chart
+
+    if chart_format == "png":
+        chart = _render_radar_png(values, labels, color)
+    else:
+        chart = _render_radar_svg(values, labels, color)
+    with _memory_lock:
+        _memory_stats["renders"] += 1
+    _memory_put(cache_key, chart)
+    if _disk_cache is not None:
+        try:
+            _disk_cache.put(cache_key, chart.encode("utf-8"))
+        except OSError as e:
+            print(f"WARNUNG: Diagramm konnte nicht im Cache gespeichert werden: {e}")
+    return chart
+
+
+def stats():
+    """Gibt die Kennzahlen des Diagramm-Caches (Speicher und Festplatte) zurück."""
+    with _memory_lock:
+        memory = dict(_memory_stats, entries=len(_memory_cache), max_entries=CHART_CACHE_SIZE)
+    lookups = memory["hits"] + memory["misses"]
+    memory["hit_rate"] = round(memory["hits"] / lookups, 3) if lookups else 0.0
+    return {
+        "style_version": STYLE_VERSION,
+        "format": PDF_CHART_FORMAT,
+        "memory": memory,
+        "disk": _disk_cache.stats() if _disk_cache is not None else None,
+    }
@@ -13,6 +13,156 @@ APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 DATABASE = os.path.join(APP_ROOT, 'database.db')
 PER_PAGE = 10
 
+# Stand des Schemas nach migrate_db (PRAGMA user_version); bei neuen Migrationen erhöhen.
+SCHEMA_VERSION = 1
+
+# Idempotente Schema-Erweiterungen für bestehende Datenbanken (siehe schema.sql).
+MIGRATIONS = [
+    """CREATE TABLE IF NOT EXISTS ai_calls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        participant_id INTEGER,
+        provider TEXT NOT NULL,
+        requested_provider TEXT,
+        model TEXT,
+        prompt_hash TEXT,
+        prompt_chars INTEGER,
+        response_chars INTEGER,
+        estimated_prompt_tokens INTEGER,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        latency_ms INTEGER,
+        retries INTEGER DEFAULT 0,
+        streamed INTEGER DEFAULT 0,
+        outcome TEXT NOT NULL,
+        error_class TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_ai_calls_created_at ON ai_calls (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_ai_calls_provider ON ai_calls (provider, created_at)",
+    """CREATE TABLE IF NOT EXISTS participant_ratings (
+        participant_id INTEGER NOT NULL,
+        group_id INTEGER NOT NULL,
+        scale TEXT NOT NULL,
+        competency TEXT NOT NULL,
+        value REAL,
+        PRIMARY KEY (participant_id, scale, competency)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_ratings_group ON participant_ratings "
+    "(group_id, scale, competency, value)",
+    "CREATE INDEX IF NOT EXISTS idx_ratings_competency ON participant_ratings "
+    "(scale, competency, value)",
+]
+
+# Spalten, die bestehenden Tabellen nachträglich hinzugefügt werden: (Tabelle, Spalte, Typ).
+COLUMN_MIGRATIONS = [
+    ("participants", "ki_input_fingerprint", "TEXT"),
+    ("participants", "ki_analysis_status", "TEXT"),
+    ("participants", "ki_analyzed_at", "TIMESTAMP"),
+    ("groups", "updated_at", "TIMESTAMP"),
+    # Zähler je Änderung; Teil des PDF-Cache-Schlüssels (updated_at hat nur Sekundenauflösung).
+    ("participants", "revision", "INTEGER NOT NULL DEFAULT 0"),
+    ("groups", "revision", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# JSON-Spalten der Bewertungen und ihr Kürzel in participant_ratings.scale.
+RATING_SCALES = {"sk_ratings": "sk", "vk_ratings": "vk"}
+
+AI_CALL_COLUMNS = (
+    "participant_id", "provider", "requested_provider", "model", "prompt_hash",
+    "prompt_chars", "response_chars", "estimated_prompt_tokens", "prompt_tokens",
+    "completion_tokens", "latency_ms", "retries", "streamed", "outcome", "error_class",
+)
+
+
+def migrate_db():
+    """Bringt das Schema einer bestehenden Datenbank auf den aktuellen Stand."""
+    conn = sqlite3.connect(DATABASE)
+    try:
+        with conn:
+            for statement in MIGRATIONS:
+                conn.execute(statement)
+            # ALTER TABLE ... ADD COLUMN ist nicht idempotent, daher vorher prüfen.
+            for table, column, column_type in COLUMN_MIGRATIONS:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            _backfill_ratings(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    finally:
+        conn.close()
+
+
+def check_schema():
+    """Bricht mit einer klaren Meldung ab, wenn die Datenbank nicht migriert ist."""
+    conn = sqlite3.connect(DATABASE)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+    if version < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Datenbankschema veraltet (Version {version}, erwartet {SCHEMA_VERSION}) in "
+            f"{DATABASE}. Bitte zuerst `flask --app app migrate-db` ausführen."
+        )
+
+
+def _rating_rows(participant_id, group_id, scale, ratings):
+    """Wandelt ein Bewertungs-Dictionary in Zeilen für participant_ratings um."""
+    if not isinstance(ratings, dict):
+        return []
+    rows = []
+    for competency, value in ratings.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = None
+        rows.append((participant_id, group_id, scale, str(competency), value))
+    return rows
+
+
+def _insert_ratings(db_conn, rows):
+    db_conn.executemany(
+        "INSERT OR REPLACE INTO participant_ratings "
+        "(participant_id, group_id, scale, competency, value) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+
+
+def _replace_ratings(db_conn, participant_id, scale, ratings):
+    """Ersetzt die Bewertungen einer Skala eines Teilnehmers in participant_ratings."""
+    db_conn.execute("DELETE FROM participant_ratings WHERE participant_id = ? AND scale = ?",
+                    (participant_id, scale))
+    row = db_conn.execute("SELECT group_id FROM participants WHERE id = ?",
+                          (participant_id,)).fetchone()
+    if row is not None:
+        _insert_ratings(db_conn, _rating_rows(participant_id, row[0], scale, ratings))
+
+
+def _backfill_ratings(conn):
+    """
+    Überträgt die Bewertungen aus den JSON-Spalten einmalig nach participant_ratings.
+    Berücksichtigt nur Teilnehmer, für die dort noch keine Zeilen existieren.
+    """
+    cursor = conn.execute(
+        "SELECT id, group_id, sk_ratings, vk_ratings FROM participants "
+        "WHERE id NOT IN (SELECT DISTINCT participant_id FROM participant_ratings)"
+    )
+    migrated = 0
+    for participant_id, group_id, *columns in cursor.fetchall():
+        rows = []
+        for scale, value in zip(RATING_SCALES.values(), columns):
+            try:
+                ratings = json.loads(value) if value else None
+            except json.JSONDecodeError:
+                ratings = None
+            rows.extend(_rating_rows(participant_id, group_id, scale, ratings))
+        if rows:
+            _insert_ratings(conn, rows)
+            migrated += 1
+    if migrated:
+        print(f"--- DEBUG-INFO: Bewertungen von {migrated} Teilnehmern nach "
+              "participant_ratings übernommen ---")
+
 
 def get_dashboard_stats():
     """Holt die aggregierten Statistiken für das Dashboard."""
@@ -43,6 +193,62 @@ def get_recently_updated_participants(limit=5):
     return query_db(query, (limit,))
 
 
+def get_group_rating_averages(group_id):
+    """
+    Durchschnitt, Minimum und Maximum je Kompetenz einer Gruppe (aus
+    participant_ratings). Noch nicht bewertete Kompetenzen (0) zählen nicht mit.
+    """
+    rows = query_db(
+        """SELECT scale, competency, AVG(value) AS avg, MIN(value) AS min,
+                  MAX(value) AS max, COUNT(value) AS count
+           FROM participant_ratings
+           WHERE group_id = ? AND value > 0
+           GROUP BY scale, competency""",
+        (group_id,)
+    )
+    averages = {}
+    for row in rows:
+        averages.setdefault(row['scale'], {})[row['competency']] = {
+            'avg': round(row['avg'], 2), 'min': row['min'],
+            'max': row['max'], 'count': row['count'],
+        }
+    return averages
+
+
+def get_rating_distribution():
+    """
+    Verteilung der Bewertungen je Kompetenz über alle Gruppen:
+    {skala: {kompetenz: {wert: anzahl}}}.
+    """
+    rows = query_db(
+        """SELECT scale, competency, value, COUNT(*) AS count
+           FROM participant_ratings
+           WHERE value > 0
+           GROUP BY scale, competency, value"""
+    )
+    distribution = {}
+    for row in rows:
+        competencies = distribution.setdefault(row['scale'], {})
+        competencies.setdefault(row['competency'], {})[row['value']] = row['count']
+    return distribution
+
+
+def get_rated_participant_counts(group_id=None):
+    """
+    Anzahl der Teilnehmer mit mindestens einer Bewertung je Gruppe (optional
+    nur für eine Gruppe).
+    """
+    group_filter, args = ("AND group_id = ?", (group_id,)) if group_id is not None else ("", ())
+    rows = query_db(
+        f"""SELECT group_id, COUNT(DISTINCT participant_id) AS count
+            FROM participant_ratings
+            WHERE value > 0 {group_filter}
+            GROUP BY group_id""",
+        args
+    )
+    return {row['group_id']: row['count'] for row in rows}
+
+
 def get_db():
     """Öffnet eine neue DB-Verbindung oder gibt die bestehende aus dem Kontext zurück."""
     if 'db' not in g:
@@ -192,7 +398,8 @@ def update_group_details(group_id, details):
     """Aktualisiert die Details einer Gruppe."""
     db_conn = get_db()
     set_clause = ", ".join([f"{key} = ?" for key in details.keys()])
-    query = f"UPDATE groups SET {set_clause} WHERE id = ?"
+    query = (f"UPDATE groups SET {set_clause}, updated_at = CURRENT_TIMESTAMP, "
+             "revision = revision + 1 WHERE id = ?")
     values = list(details.values()) + [group_id]
     db_conn.execute(query, tuple(values))
     db_conn.commit()
@@ -201,6 +408,7 @@ def update_group_details(group_id, details):
 def delete_group_by_id(group_id):
     """Löscht eine Gruppe und alle zugehörigen Teilnehmer."""
     db_conn = get_db()
+    db_conn.execute('DELETE FROM participant_ratings WHERE group_id = ?', (group_id,))
     db_conn.execute('DELETE FROM participants WHERE group_id = ?', (group_id,))
     db_conn.execute('DELETE FROM groups WHERE id = ?', (group_id,))
     db_conn.commit()
@@ -211,14 +419,18 @@ def add_multiple_participants_to_group(group_id, names):
     db_conn = get_db()
     cursor = db_conn.cursor()
     empty_json = json.dumps({})
-    sk_ratings_default = json.dumps({
-        "flexibility": 0.0, "team_orientation": 0.0,
-        "process_orientation": 0.0, "results_orientation": 0.0
-    })
-    vk_ratings_default = json.dumps({
-        "flexibility": 0.0, "consulting": 0.0,
-        "objectivity": 0.0, "goal_orientation": 0.0
-    })
+    default_ratings = {
+        "sk_ratings": {
+            "flexibility": 0.0, "team_orientation": 0.0,
+            "process_orientation": 0.0, "results_orientation": 0.0
+        },
+        "vk_ratings": {
+            "flexibility": 0.0, "consulting": 0.0,
+            "objectivity": 0.0, "goal_orientation": 0.0
+        },
+    }
+    sk_ratings_default = json.dumps(default_ratings["sk_ratings"])
+    vk_ratings_default = json.dumps(default_ratings["vk_ratings"])
     participants_to_add = [
         (group_id, name.strip(), empty_json, empty_json, sk_ratings_default,
          vk_ratings_default, empty_json, "{}", empty_json)
@@ -232,6 +444,19 @@ def add_multiple_participants_to_group(group_id, names):
                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             participants_to_add
         )
+        # Innerhalb der laufenden Schreibtransaktion sind die neuesten IDs der Gruppe unsere.
+        new_ids = [row[0] for row in cursor.execute(
+            "SELECT id FROM participants WHERE group_id = ? ORDER BY id DESC LIMIT ?",
+            (group_id, len(participants_to_add))
+        )]
+        rating_rows = [
+            rating_row
+            for participant_id in new_ids
+            for column, scale in RATING_SCALES.items()
+            for rating_row in _rating_rows(participant_id, group_id, scale,
+                                           default_ratings[column])
+        ]
+        _insert_ratings(db_conn, rating_rows)
         db_conn.commit()
     return len(participants_to_add)
 
@@ -239,7 +464,8 @@ def add_multiple_participants_to_group(group_id, names):
 def update_participant_name(participant_id, new_name):
     """Aktualisiert den Namen eines Teilnehmers."""
     db_conn = get_db()
-    query = 'UPDATE participants SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?'
+    query = ('UPDATE participants SET name = ?, updated_at = CURRENT_TIMESTAMP, '
+             'revision = revision + 1 WHERE id = ?')
     db_conn.execute(query, (new_name, participant_id))
     db_conn.commit()
 
@@ -247,6 +473,7 @@ def update_participant_name(participant_id, new_name):
 def delete_participant_by_id(participant_id):
     """Löscht einen Teilnehmer anhand seiner ID."""
     db_conn = get_db()
+    db_conn.execute('DELETE FROM participant_ratings WHERE participant_id = ?', (participant_id,))
     db_conn.execute('DELETE FROM participants WHERE id = ?', (participant_id,))
     db_conn.commit()
 
@@ -257,11 +484,15 @@ def save_participant_data(participant_id, data_dict):
     updates = {key: json.dumps(value) for key, value in data_dict.items()}
     set_clause = ", ".join(
         [f"{key} = ?" for key in updates.keys()]
-    ) + ", updated_at = CURRENT_TIMESTAMP"
+    ) + ", updated_at = CURRENT_TIMESTAMP, revision = revision + 1"
 
     query = f"UPDATE participants SET {set_clause} WHERE id = ?"
     values = list(updates.values()) + [participant_id]
     db_conn.execute(query, tuple(values))
+    # Bewertungen zusätzlich in participant_ratings spiegeln (gleiche Transaktion).
+    for column, scale in RATING_SCALES.items():
+        if column in data_dict:
+            _replace_ratings(db_conn, participant_id, scale, data_dict[column])
     db_conn.commit()
 
 
@@ -275,6 +506,23 @@ def save_ki_raw_response(participant_id, raw_response):
     db_conn.commit()
 
 
+def save_ki_analysis_state(participant_id, status, fingerprint=None):
+    """
+    Speichert das Ergebnis der letzten KI-Analyse (`success` oder `error`) und
+    bei Erfolg den Fingerabdruck der verwendeten Eingaben.
+    """
+    db_conn = get_db()
+    db_conn.execute(
+        """UPDATE participants
+           SET ki_analysis_status = ?,
+               ki_input_fingerprint = COALESCE(?, ki_input_fingerprint),
+               ki_analyzed_at = CURRENT_TIMESTAMP
+           WHERE id = ?""",
+        (status, fingerprint, participant_id)
+    )
+    db_conn.commit()
+
+
 def save_report_details(participant_id, group_details, footer_data):
     """Speichert aktualisierte Gruppen- und Fußzeilendetails."""
     db_conn = get_db()
@@ -285,13 +533,15 @@ def save_report_details(participant_id, group_details, footer_data):
         return
     group_id = group_id_result['group_id']
     set_clause_group = ", ".join([f"{key} = ?" for key in group_details.keys()])
-    query_group = f"UPDATE groups SET {set_clause_group} WHERE id = ?"
+    query_group = (f"UPDATE groups SET {set_clause_group}, updated_at = CURRENT_TIMESTAMP, "
+                   "revision = revision + 1 WHERE id = ?")
     values_group = list(group_details.values()) + [group_id]
     db_conn.execute(query_group, tuple(values_group))
 
     footer_json = json.dumps(footer_data)
     db_conn.execute(
-        'UPDATE participants SET footer_data = ? WHERE id = ?',
+        'UPDATE participants SET footer_data = ?, updated_at = CURRENT_TIMESTAMP, '
+        'revision = revision + 1 WHERE id = ?',
         (footer_json, participant_id)
     )
     db_conn.commit()
@@ -335,3 +585,33 @@ def delete_prompt_by_id(prompt_id):
     db_conn.execute("DELETE FROM prompts WHERE id = ?", (prompt_id,))
     db_conn.commit()
 
+
+def insert_ai_call(record):
+    """
+    Schreibt einen Eintrag in das Protokoll der KI-Aufrufe. Nutzt eine eigene
+    Verbindung, damit auch Worker-Threads ohne App-Kontext protokollieren können.
+    """
+    columns = [column for column in AI_CALL_COLUMNS if column in record]
+    placeholders = ", ".join("?" for _ in columns)
+    conn = sqlite3.connect(DATABASE, timeout=10)
+    try:
+        with conn:
+            conn.execute(
+                f"INSERT INTO ai_calls ({', '.join(columns)}) VALUES ({placeholders})",
+                tuple(record[column] for column in columns)
+            )
+    finally:
+        conn.close()
+
+
+def get_ai_calls_since(days):
+    """Holt die KI-Aufrufe der letzten `days` Tage für die Auswertung."""
+    return query_db(
+        """SELECT date(created_at) AS day, provider, model, latency_ms, outcome,
+                  error_class, retries, prompt_tokens, completion_tokens,
+                  estimated_prompt_tokens
+           FROM ai_calls
+           WHERE created_at >= datetime('now', ?)
+           ORDER BY created_at""",
+        (f"-{int(days)} days",)
+    )
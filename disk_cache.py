@@ -0,0 +1,153 @@
+"""
+Dieses Modul enthält einen einfachen, dateibasierten Cache.
+
+Jeder Eintrag ist eine Datei im Cache-Verzeichnis. Der Zeitpunkt der letzten
+Nutzung wird über die Änderungszeit der Datei geführt; daraus ergeben sich
+sowohl der Ablauf (TTL) als auch die LRU-Verdrängung bei Überschreiten der
+maximalen Gesamtgröße. Schreibvorgänge erfolgen atomar über temporäre Dateien.
+"""
+
+import os
+import re
+import tempfile
+import threading
+import time
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_ROOT = os.getenv("APP_CACHE_DIR", os.path.join(APP_ROOT, "cache"))
+
+_KEY_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,200}$")
+
+
+class DiskCache:
+    """Dateibasierter Cache mit optionaler Maximalgröße und Ablaufzeit."""
+
+    def __init__(self, name, max_bytes=None, ttl_seconds=None, suffix=".bin"):
+        self.directory = os.path.join(CACHE_ROOT, name)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        """Gibt den Dateipfad eines Schlüssels zurück (ohne Prüfung auf Existenz)."""
+        if not _KEY_PATTERN.match(key):
+            raise ValueError(f"Ungültiger Cache-Schlüssel: {key!r}")
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get_path(self, key):
+        """Gibt den Pfad eines gültigen Eintrags zurück und markiert ihn als genutzt."""
+        path = self.path_for(key)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        if self.ttl_seconds is not None and time.time() - mtime > self.ttl_seconds:
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return path
+
+    def get(self, key):
+        """Liest einen Eintrag als Bytes oder gibt None zurück."""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as handle:
+                return handle.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """Schreibt einen Eintrag atomar und räumt den Cache bei Bedarf auf."""
+        path = self.path_for(key)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def delete(self, key):
+        """Entfernt einen Eintrag, falls vorhanden."""
+        self._remove(self.path_for(key))
+
+    def delete_prefix(self, prefix):
+        """Entfernt alle Einträge, deren Schlüssel mit `prefix` beginnt."""
+        for entry in self._entries():
+            if entry.name.startswith(prefix):
+                self._remove(entry.path)
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self.directory)
+                    if entry.is_file() and entry.name.endswith(self.suffix)]
+        except OSError:
+            return []
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Entfernt abgelaufene Einträge und die am längsten ungenutzten über dem Limit."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if self.ttl_seconds is not None and now - stat.st_mtime > self.ttl_seconds:
+                    self._remove(entry.path)
+                    self.evictions += 1
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            if self.max_bytes is None:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        """Gibt Treffer, Fehlzugriffe, Verdrängungen und die aktuelle Größe zurück."""
+        entries = self._entries()
+        size = 0
+        for entry in entries:
+            try:
+                size += entry.stat().st_size
+            except OSError:
+                continue
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(entries),
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,161 @@
+"""
+Dieses Modul enthält einen persistenten Cache für KI-Antworten.
+
+Die Antworten werden in einer eigenen SQLite-Datenbank neben `database.db`
+abgelegt. Der Schlüssel ist ein SHA-256-Hash über Modell, Modellname,
+System-Prompt und finalen Prompt-Text, sodass identische Anfragen ohne
+erneuten API-Aufruf beantwortet werden können.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DATABASE = os.getenv("KI_CACHE_PATH", os.path.join(APP_ROOT, "ki_cache.db"))
+CACHE_ENABLED = os.getenv("KI_CACHE_ENABLED", "1") != "0"
+CACHE_TTL_SECONDS = int(os.getenv("KI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("KI_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ki_cache (
+    cache_key TEXT PRIMARY KEY,
+    ki_model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_ki_cache_last_access ON ki_cache (last_access);
+CREATE TABLE IF NOT EXISTS ki_cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    """Öffnet eine Verbindung zur Cache-Datenbank und legt das Schema bei Bedarf an."""
+    global _initialized  # pylint: disable=global-statement
+    conn = sqlite3.connect(CACHE_DATABASE, timeout=10)
+    if not _initialized:
+        with _init_lock:
+            conn.executescript(_SCHEMA)
+            _initialized = True
+    return conn
+
+
+def _count(conn, name, amount=1):
+    """Erhöht einen persistenten Zähler (hits, misses, evictions)."""
+    conn.execute(
+        "INSERT INTO ki_cache_stats (name, value) VALUES (?, ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, amount)
+    )
+
+
+def make_key(ki_model, model_name, system_prompt, prompt_text):
+    """Berechnet den inhaltsbasierten Cache-Schlüssel einer KI-Anfrage."""
+    digest = hashlib.sha256()
+    for part in (ki_model, model_name, system_prompt, prompt_text):
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def get(cache_key):
+    """Gibt die gecachte Antwort zurück oder None, wenn sie fehlt oder abgelaufen ist."""
+    if not CACHE_ENABLED:
+        return None
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT response, created_at FROM ki_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row and now - row[1] <= CACHE_TTL_SECONDS:
+            conn.execute(
+                "UPDATE ki_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                (now, cache_key)
+            )
+            _count(conn, "hits")
+            conn.commit()
+            return row[0]
+        if row:
+            conn.execute("DELETE FROM ki_cache WHERE cache_key = ?", (cache_key,))
+        _count(conn, "misses")
+        conn.commit()
+        return None
+    finally:
+        conn.close()
+
+
+def put(cache_key, ki_model, response):
+    """Speichert eine Antwort im Cache und räumt anschließend auf."""
+    if not CACHE_ENABLED:
+        return
+    now = time.time()
+    size = len(response.encode("utf-8"))
+    conn = _connect()
+    try:
+        conn.execute(
+            """INSERT OR REPLACE INTO ki_cache
+               (cache_key, ki_model, response, size, created_at, last_access, hits)
+               VALUES (?, ?, ?, ?, ?, ?, 0)""",
+            (cache_key, ki_model, response, size, now, now)
+        )
+        _evict(conn, now)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _evict(conn, now):
+    """Entfernt abgelaufene Einträge und die am längsten ungenutzten über dem Größenlimit."""
+    expired = conn.execute(
+        "DELETE FROM ki_cache WHERE created_at < ?", (now - CACHE_TTL_SECONDS,)
+    ).rowcount
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ki_cache").fetchone()[0]
+    evicted = 0
+    if total > CACHE_MAX_BYTES:
+        rows = conn.execute(
+            "SELECT cache_key, size FROM ki_cache ORDER BY last_access ASC"
+        ).fetchall()
+        for cache_key, size in rows:
+            if total <= CACHE_MAX_BYTES:
+                break
+            conn.execute("DELETE FROM ki_cache WHERE cache_key = ?", (cache_key,))
+            total -= size
+            evicted += 1
+    if expired + evicted:
+        _count(conn, "evictions", expired + evicted)
+
+
+def stats():
+    """Gibt Trefferzähler, Anzahl und Größe der Cache-Einträge zurück."""
+    conn = _connect()
+    try:
+        counters = dict(conn.execute("SELECT name, value FROM ki_cache_stats").fetchall())
+        entries, size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ki_cache"
+        ).fetchone()
+    finally:
+        conn.close()
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    return {
+        "enabled": CACHE_ENABLED,
+        "entries": entries,
+        "size_bytes": size,
+        "max_bytes": CACHE_MAX_BYTES,
+        "ttl_seconds": CACHE_TTL_SECONDS,
+        "hits": hits,
+        "misses": misses,
+        "evictions": counters.get("evictions", 0),
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+    }
@@ -0,0 +1,138 @@
+"""
+Dieses Modul enthält Circuit Breaker für die KI-Provider.
+
+Für jede Kombination aus Provider und Modell wird gezählt, wie viele Aufrufe in
+Folge fehlgeschlagen sind. Ab `KI_BREAKER_FAILURES` Fehlern wird der Breaker
+geöffnet: Weitere Aufrufe scheitern sofort oder werden an ein konfiguriertes
+Ersatzmodell (`KI_FALLBACK_<MODELL>`, z. B. `KI_FALLBACK_GEMINI=mistral`)
+umgeleitet. Nach `KI_BREAKER_RESET_SECONDS` lässt der Breaker einen einzelnen
+Probeaufruf durch (halb offen); gelingt er, wird er wieder geschlossen.
+"""
+
+import os
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+class CircuitOpenError(ValueError):
+    """Der Provider ist nach wiederholten Fehlern vorübergehend gesperrt."""
+
+
+def _int_setting(name, default):
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """Zustand eines Circuit Breakers für einen Provider und ein Modell."""
+
+    def __init__(self, name, failure_threshold, reset_seconds):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self.rejected = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Prüft, ob ein Aufruf erlaubt ist; im halb offenen Zustand nur ein Probeaufruf."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self.probe_started_at = None
+            if self.state == HALF_OPEN:
+                # Ein hängengebliebener Probeaufruf blockiert nicht dauerhaft.
+                if self.probe_started_at is None or \
+                        now - self.probe_started_at >= self.reset_seconds:
+                    self.probe_started_at = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Schließt den Breaker nach einem erfolgreichen Aufruf."""
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"--- DEBUG-INFO: Circuit Breaker '{self.name}' wieder geschlossen ---")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.probe_started_at = None
+
+    def record_failure(self):
+        """Zählt einen Fehler und öffnet den Breaker bei Erreichen der Schwelle."""
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    print(f"WARNUNG: Circuit Breaker '{self.name}' geöffnet nach "
+                          f"{self.consecutive_failures} Fehlern in Folge.")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.probe_started_at = None
+
+    def retry_in(self):
+        """Sekunden bis zum nächsten Probeaufruf (0, wenn der Breaker nicht offen ist)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def to_dict(self):
+        """Gibt den Zustand als JSON-serialisierbares Dictionary zurück."""
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                "retry_in_seconds": round(retry_in, 1),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+def get_breaker(ki_model, model_name):
+    """Gibt den Breaker für Provider und Modell zurück und legt ihn bei Bedarf an."""
+    name = f"{ki_model}:{model_name}"
+    with _lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                _int_setting("KI_BREAKER_FAILURES", 5),
+                _int_setting("KI_BREAKER_RESET_SECONDS", 60),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def fallback_for(ki_model):
+    """Gibt das konfigurierte Ersatzmodell zurück (oder None)."""
+    env_key = f"KI_FALLBACK_{str(ki_model).upper().replace('-', '_')}"
+    fallback = os.getenv(env_key, "").strip()
+    return fallback if fallback and fallback != ki_model else None
+
+
+def stats():
+    """Gibt den Zustand aller Breaker zurück."""
+    with _lock:
+        breakers = dict(_breakers)
+    return {name: breaker.to_dict() for name, breaker in sorted(breakers.items())}
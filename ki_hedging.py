@@ -0,0 +1,177 @@
+"""
+Dieses Modul enthält das optionale Hedging von KI-Anfragen.
+
+Antwortet der primäre Provider nicht innerhalb einer Frist, wird derselbe
+Prompt zusätzlich an einen zweiten Provider geschickt. Die erste parsebare
+Antwort gewinnt; die andere Anfrage wird – soweit sie noch nicht läuft –
+abgebrochen, ansonsten wird ihr Ergebnis verworfen. Die Frist ergibt sich aus
+einem Perzentil der zuletzt gemessenen Antwortzeiten des primären Providers.
+
+Konfiguration:
+
+- `KI_HEDGE_ENABLED`: Hedging aktivieren (`1`), standardmäßig aus
+- `KI_HEDGE_SECONDARY_<MODELL>`: zweiter Provider, z. B. `KI_HEDGE_SECONDARY_MISTRAL=gemini`
+  (Standard: Mistral ↔ Gemini)
+- `KI_HEDGE_PERCENTILE`: Perzentil der Antwortzeiten als Frist (Standard 95)
+- `KI_HEDGE_MIN_SAMPLES`: Messwerte, ab denen das Perzentil genutzt wird (Standard 20)
+- `KI_HEDGE_DEFAULT_DELAY_SECONDS`: Frist bis dahin (Standard 20)
+- `KI_HEDGE_MIN_DELAY_SECONDS`: Untergrenze der Frist (Standard 2)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_SECONDARY = {"mistral": "gemini", "gemini": "mistral"}
+LATENCY_WINDOW = 200
+HEDGE_WORKERS = 16
+
+_latencies = {}
+_stats = {}
+_lock = threading.Lock()
+_executor = None
+
+
+def _float_setting(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return float(default)
+
+
+def is_enabled():
+    """Gibt an, ob das Hedging aktiviert ist."""
+    return os.getenv("KI_HEDGE_ENABLED", "0").lower() in ("1", "true", "yes", "on")
+
+
+def secondary_for(ki_model):
+    """Gibt den zweiten Provider für ein KI-Modell zurück (oder None)."""
+    env_key = f"KI_HEDGE_SECONDARY_{str(ki_model).upper().replace('-', '_')}"
+    secondary = os.getenv(env_key, DEFAULT_SECONDARY.get(ki_model, ""))
+    return secondary if secondary and secondary != ki_model else None
+
+
+def record_latency(ki_model, seconds):
+    """Merkt sich die Dauer einer erfolgreichen Anfrage."""
+    with _lock:
+        _latencies.setdefault(ki_model, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def latency_percentile(ki_model, percentile):
+    """Gibt das Perzentil der zuletzt gemessenen Antwortzeiten zurück (oder None)."""
+    with _lock:
+        samples = sorted(_latencies.get(ki_model, ()))
+    if not samples:
+        return None
+    index = max(0, math.ceil(percentile / 100 * len(samples)) - 1)
+    return round(samples[index], 3)
+
+
+def hedge_delay(ki_model):
+    """Berechnet die Frist, nach der die zweite Anfrage gestartet wird."""
+    min_samples = int(_float_setting("KI_HEDGE_MIN_SAMPLES", 20))
+    with _lock:
+        sample_count = len(_latencies.get(ki_model, ()))
+    if sample_count < min_samples:
+        return _float_setting("KI_HEDGE_DEFAULT_DELAY_SECONDS", 20)
+    delay = latency_percentile(ki_model, _float_setting("KI_HEDGE_PERCENTILE", 95))
+    return max(_float_setting("KI_HEDGE_MIN_DELAY_SECONDS", 2), delay)
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS,
+                                           thread_name_prefix="ki-hedge")
+        return _executor
+
+
+def _count(ki_model, outcome):
+    with _lock:
+        counters = _stats.setdefault(ki_model, {})
+        counters[outcome] = counters.get(outcome, 0) + 1
+
+
+def _timed(call_func, prompt_text, ki_model):
+    started = time.monotonic()
+    response_text = call_func(prompt_text, ki_model)
+    return response_text, time.monotonic() - started
+
+
+def hedged_call(prompt_text, ki_model, call_func, is_valid):
+    """
+    Führt `call_func(prompt_text, modell)` für den primären Provider aus und
+    startet nach Ablauf der Frist zusätzlich den zweiten Provider. Gibt
+    `(antworttext, genutztes_modell)` der ersten gültigen Antwort zurück.
+    Scheitern beide Anfragen, wird der Fehler des primären Providers geworfen.
+    """
+    secondary = secondary_for(ki_model)
+    delay = hedge_delay(ki_model)
+    executor = _get_executor()
+    started = time.monotonic()
+    futures = {executor.submit(_timed, call_func, prompt_text, ki_model): ki_model}
+
+    done, _ = wait(futures, timeout=delay)
+    if not done and secondary:
+        print(f"--- DEBUG-INFO: '{ki_model}' antwortet nicht innerhalb von {delay:.1f}s, "
+              f"zusätzliche Anfrage an '{secondary}' ---")
+        futures[executor.submit(_timed, call_func, prompt_text, secondary)] = secondary
+        _count(ki_model, "hedged")
+
+    errors = {}
+    fallback = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            model = futures[future]
+            try:
+                response_text, duration = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                errors[model] = e
+                continue
+            record_latency(model, duration)
+            if not is_valid(response_text):
+                fallback = fallback or (response_text, model)
+                continue
+            for other in pending:
+                other.cancel()
+            if len(futures) == 1:
+                _count(ki_model, "in_time")
+            else:
+                _count(ki_model, "primary_won" if model == ki_model else "secondary_won")
+                print(f"--- DEBUG-INFO: Hedging für '{ki_model}': '{model}' gewinnt nach "
+                      f"{time.monotonic() - started:.2f}s (Frist {delay:.1f}s) ---")
+            return response_text, model
+
+    _count(ki_model, "failed")
+    if fallback:
+        return fallback
+    raise errors.get(ki_model) or next(iter(errors.values()))
+
+
+def stats():
+    """Gibt Fristen, Antwortzeit-Perzentile und Hedging-Ergebnisse je Provider zurück."""
+    with _lock:
+        models = set(_latencies) | set(_stats)
+        counters = {model: dict(_stats.get(model, {})) for model in models}
+        sample_counts = {model: len(_latencies.get(model, ())) for model in models}
+    return {
+        "enabled": is_enabled(),
+        "providers": {
+            model: {
+                "secondary": secondary_for(model),
+                "delay_seconds": round(hedge_delay(model), 3),
+                "samples": sample_counts[model],
+                "p50_seconds": latency_percentile(model, 50),
+                "p95_seconds": latency_percentile(model, 95),
+                "p99_seconds": latency_percentile(model, 99),
+                **counters[model],
+            }
+            for model in sorted(models)
+        },
+    }
@@ -0,0 +1,125 @@
+"""
+Dieses Modul enthält die Registry der KI-Provider.
+
+Die SDKs (google-generativeai, mistralai) werden erst beim ersten Zugriff auf
+einen Provider importiert und konfiguriert. Das Ergebnis wird pro Prozess
+zwischengespeichert, sodass der Start der Anwendung keine KI-Bibliothek lädt.
+"""
+
+import os
+import threading
+from types import SimpleNamespace
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def _load_gemini():
+    """Importiert und konfiguriert das Google-Generative-AI-SDK."""
+    try:
+        # pylint: disable=import-outside-toplevel
+        import google.generativeai as genai
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        print("WARNUNG: google-generativeai nicht installiert. Google-Modelle nicht verfügbar.")
+        return None
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if api_key:
+        genai.configure(api_key=api_key)
+    else:
+        print("WARNUNG: GOOGLE_API_KEY nicht gefunden. Google-Modelle sind nicht verfügbar.")
+    return SimpleNamespace(
+        name="gemini",
+        GenerativeModel=genai.GenerativeModel,
+        list_models=genai.list_models,
+        exceptions=google_exceptions,
+        error_types=(google_exceptions.GoogleAPICallError,),
+    )
+
+
+def _load_mistral():
+    """Importiert das Mistral-SDK und erzeugt den Client."""
+    try:
+        # pylint: disable=import-outside-toplevel
+        from mistralai.client import MistralClient
+        from mistralai.models.chat_completion import ChatMessage
+        from mistralai.exceptions import (MistralAPIException, MistralConnectionException,
+                                          MistralException)
+    except ImportError:
+        print("WARNUNG: mistralai nicht installiert. Mistral-Modelle nicht verfügbar.")
+        return None
+
+    api_key = os.getenv("MISTRAL_API_KEY")
+    # Optional kann ein anderer Endpunkt angegeben werden, z. B. ein lokaler Fake-Server.
+    endpoint = os.getenv("MISTRAL_ENDPOINT")
+    client_kwargs = {"endpoint": endpoint} if endpoint else {}
+    if not api_key:
+        print("WARNUNG: MISTRAL_API_KEY nicht gefunden. Mistral-Modelle sind nicht verfügbar.")
+    return SimpleNamespace(
+        name="mistral",
+        client=MistralClient(api_key=api_key, **client_kwargs) if api_key else None,
+        ChatMessage=ChatMessage,
+        APIException=MistralAPIException,
+        ConnectionException=MistralConnectionException,
+        error_types=(MistralException,),
+    )
+
+
+def _load_local_stub():
+    """Lädt den lokalen Stand-in-Provider, sofern er per KI_STUB_ENABLED freigegeben ist."""
+    if os.getenv("KI_STUB_ENABLED") != "1":
+        print("WARNUNG: Provider 'local-stub' ist deaktiviert (KI_STUB_ENABLED=1 setzen).")
+        return None
+    import ki_stub  # pylint: disable=import-outside-toplevel
+    return SimpleNamespace(
+        name="local-stub",
+        generate=ki_stub.generate,
+        generate_stream=ki_stub.generate_stream,
+        error_types=(ki_stub.StubProviderError,),
+    )
+
+
+PROVIDER_LOADERS = {
+    "gemini": _load_gemini,
+    "mistral": _load_mistral,
+    "local-stub": _load_local_stub,
+}
+
+
+def is_known_provider(name):
+    """Prüft, ob `name` ein gültiger Provider ist (local-stub nur mit KI_STUB_ENABLED=1)."""
+    if name == "local-stub":
+        return os.getenv("KI_STUB_ENABLED") == "1"
+    return name in PROVIDER_LOADERS
+
+
+def get_provider(name):
+    """
+    Gibt den Provider mit dem angegebenen Namen zurück und lädt ihn beim ersten
+    Zugriff. Gibt None zurück, wenn das SDK nicht installiert ist.
+    """
+    if name in _providers:
+        return _providers[name]
+    loader = PROVIDER_LOADERS.get(name)
+    if loader is None:
+        return None
+    with _lock:
+        if name not in _providers:
+            _providers[name] = loader()
+        return _providers[name]
+
+
+def peek_provider(name):
+    """Gibt einen Provider nur zurück, wenn er bereits geladen wurde."""
+    return _providers.get(name)
+
+
+def loaded_providers():
+    """Gibt alle bereits geladenen (und verfügbaren) Provider zurück."""
+    return [provider for provider in list(_providers.values()) if provider]
+
+
+def provider_error_types():
+    """Gibt die Fehlerklassen der bereits geladenen SDKs als Tupel zurück."""
+    return tuple(error for provider in loaded_providers() for error in provider.error_types)
@@ -0,0 +1,116 @@
+"""
+Dieses Modul enthält die Ratenbegrenzung für KI-Provider.
+
+Pro Provider werden zwei Token-Buckets geführt: einer für Anfragen pro Minute
+und einer für (geschätzte) Tokens pro Minute. Die Limits werden über
+Umgebungsvariablen wie `MISTRAL_RPM` und `MISTRAL_TPM` konfiguriert; ein Wert
+von 0 deaktiviert das jeweilige Limit.
+"""
+
+import os
+import random
+import threading
+import time
+
+DEFAULT_LIMITS = {
+    "mistral": {"rpm": 60, "tpm": 500000},
+    "gemini": {"rpm": 60, "tpm": 1000000},
+}
+
+MAX_RETRIES = int(os.getenv("KI_MAX_RETRIES", "4"))
+BACKOFF_BASE_SECONDS = float(os.getenv("KI_BACKOFF_BASE_SECONDS", "1.0"))
+BACKOFF_MAX_SECONDS = float(os.getenv("KI_BACKOFF_MAX_SECONDS", "30.0"))
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Ein thread-sicherer Token-Bucket mit einer Kapazität pro Minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount):
+        """Reserviert `amount` Tokens und gibt die nötige Wartezeit in Sekunden zurück."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def pause(self, seconds):
+        """Blockiert den Bucket für alle Aufrufer, z. B. nach einer 429-Antwort."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class ProviderLimiter:
+    """Kombiniert die Request- und Token-Limits eines Providers."""
+
+    def __init__(self, provider, rpm, tpm):
+        self.provider = provider
+        self.request_bucket = TokenBucket(rpm) if rpm > 0 else None
+        self.token_bucket = TokenBucket(tpm) if tpm > 0 else None
+        self.buckets = [b for b in (self.request_bucket, self.token_bucket) if b]
+
+    def acquire(self, estimated_tokens):
+        """Wartet, bis eine Anfrage mit der geschätzten Tokenzahl gesendet werden darf."""
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        if wait > 0:
+            print(f"--- DEBUG-INFO: Ratenlimit für '{self.provider}', "
+                  f"warte {wait:.2f}s ---")
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Pausiert alle Anfragen an diesen Provider."""
+        for bucket in self.buckets:
+            bucket.pause(seconds)
+
+
+def _env_limit(provider, kind):
+    value = os.getenv(f"{provider.upper().replace('-', '_')}_{kind.upper()}")
+    if value is None:
+        return DEFAULT_LIMITS.get(provider, {}).get(kind, 0)
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return DEFAULT_LIMITS.get(provider, {}).get(kind, 0)
+
+
+def get_limiter(provider):
+    """Gibt den (gecachten) Limiter eines Providers zurück."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = ProviderLimiter(
+                provider, _env_limit(provider, "rpm"), _env_limit(provider, "tpm")
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponentielles Backoff mit vollem Jitter; ein Retry-After-Header hat Vorrang."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    if retry_after:
+        delay = max(delay, min(float(retry_after), BACKOFF_MAX_SECONDS))
+    return delay
@@ -5,92 +5,476 @@ für die Berichtserstellung.
 
 import os
 import json
+import threading
+import time
 from dotenv import load_dotenv
 
+import ai_ledger
+import ki_cache
+import ki_circuit
+import ki_hedging
+from ki_providers import get_provider, peek_provider, provider_error_types
+from ki_ratelimit import MAX_RETRIES, backoff_delay, get_limiter
+from prompt_budget import estimate_tokens
+from utils import clean_json_response
+
 # Lade die Umgebungsvariablen aus der .env-Datei
 load_dotenv()
 
-# Versuche, die notwendigen Bibliotheken zu importieren und zu konfigurieren
-try:
-    from google.generativeai import GenerativeModel, configure, list_models
-    from google.api_core import exceptions as google_exceptions
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if GOOGLE_API_KEY:
-        configure(api_key=GOOGLE_API_KEY)
-    else:
-        print("WARNUNG: GOOGLE_API_KEY nicht gefunden. Google-Modelle sind nicht verfügbar.")
-except ImportError:
-    GenerativeModel, list_models, google_exceptions = None, None, None
-    print("WARNUNG: google-generativeai nicht installiert. Google-Modelle nicht verfügbar.")
-
-try:
-    from mistralai.client import MistralClient
-    from mistralai.models.chat_completion import ChatMessage
-    from mistralai.exceptions import MistralAPIException
-    MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-    MISTRAL_CLIENT = MistralClient(api_key=MISTRAL_API_KEY) if MISTRAL_API_KEY else None
-    if not MISTRAL_API_KEY:
-        print("WARNUNG: MISTRAL_API_KEY nicht gefunden. Mistral-Modelle sind nicht verfügbar.")
-except ImportError:
-    MistralClient, ChatMessage, MistralAPIException, MISTRAL_CLIENT = None, None, None, None
-    print("WARNUNG: mistralai nicht installiert. Mistral-Modelle nicht verfügbar.")
-
-
-def generate_report_with_ai(prompt_text, ki_model):
+# Standard-Parallelität pro Provider, überschreibbar über KI_CONCURRENCY bzw.
+# KI_CONCURRENCY_<MODELL> (z. B. KI_CONCURRENCY_MISTRAL=8).
+DEFAULT_CONCURRENCY = 4
+
+
+def get_provider_concurrency(ki_model):
+    """Gibt die maximale Anzahl paralleler Anfragen für ein KI-Modell zurück."""
+    env_key = f"KI_CONCURRENCY_{str(ki_model).upper().replace('-', '_')}"
+    value = os.getenv(env_key) or os.getenv("KI_CONCURRENCY") or DEFAULT_CONCURRENCY
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return DEFAULT_CONCURRENCY
+
+
+GEMINI_MODEL_NAME = 'models/gemini-pro-latest'
+GEMINI_MODEL_LIST_TTL_SECONDS = int(os.getenv("GEMINI_MODEL_LIST_TTL_SECONDS", "3600"))
+MISTRAL_MODEL_NAME = "mistral-large-latest"
+_gemini_models = {"names": None, "error": None, "fetched_at": None}
+_gemini_models_lock = threading.Lock()
+
+SYSTEM_PROMPT = (
+    "Du bist ein Experte für die Auswertung von Assessment-Center-Beobachtungen. "
+    "Antworte IMMER und AUSSCHLIESSLICH mit einem JSON-Objekt, das exakt "
+    "der vom User im folgenden Prompt geforderten Struktur entspricht. "
+    "Ignoriere diese Anweisung niemals."
+)
+
+
+def _model_signature(ki_model):
+    """Gibt Modellnamen und System-Prompt zurück, die an den Provider gehen."""
+    if ki_model == "gemini":
+        return GEMINI_MODEL_NAME, ""
+    if ki_model == "mistral":
+        return MISTRAL_MODEL_NAME, SYSTEM_PROMPT
+    if ki_model == "local-stub":
+        return "local-stub", SYSTEM_PROMPT
+    return None, None
+
+
+def model_identity(ki_model):
+    """Kennzeichnet Provider, Modellnamen und System-Prompt (z. B. für Fingerabdrücke)."""
+    return [ki_model, *_model_signature(ki_model)]
+
+
+def _is_cacheable(response_text):
+    """Nur parsebare Antworten ohne Fehlerfeld werden zwischengespeichert."""
+    try:
+        data = json.loads(clean_json_response(response_text))
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return not (isinstance(data, dict) and "error" in data)
+
+
+def _record_call(prompt_text, ki_model, started, outcome, participant_id=None,
+                 used_model=None, response_text=None, error=None, metrics=None,
+                 streamed=False):
+    """Protokolliert einen KI-Aufruf in der Tabelle `ai_calls`."""
+    used_model = used_model or ki_model
+    metrics = metrics or {}
+    ai_ledger.record_call(
+        participant_id=participant_id,
+        provider=used_model,
+        requested_provider=ki_model,
+        model=_model_signature(used_model)[0],
+        prompt_text=prompt_text,
+        response_text=response_text,
+        estimated_prompt_tokens=estimate_tokens(prompt_text, used_model),
+        prompt_tokens=metrics.get("prompt_tokens"),
+        completion_tokens=metrics.get("completion_tokens"),
+        latency_ms=int((time.monotonic() - started) * 1000),
+        retries=metrics.get("retries", 0),
+        streamed=int(streamed),
+        outcome=outcome,
+        error_class=type(error).__name__ if error is not None else None,
+    )
+
+
+def generate_report_with_ai(prompt_text, ki_model, use_cache=True, participant_id=None):
     """
     Generiert einen Bericht mithilfe des ausgewählten KI-Modells.
     Nutzt einen festen System-Prompt für die JSON-Struktur und den User-Prompt
-    für die inhaltlichen Anweisungen.
+    für die inhaltlichen Anweisungen. Identische Anfragen werden aus dem
+    KI-Cache beantwortet, sofern `use_cache` nicht deaktiviert ist.
+    Jeder Aufruf wird mit Dauer, Tokens und Ergebnis in `ai_calls` protokolliert.
     """
     print(f"--- DEBUG-INFO: Das übergebene 'ki_model' ist: '{ki_model}' ---")
+    started = time.monotonic()
+    model_name, system_prompt = _model_signature(ki_model)
+    cache_key = None
+    if model_name:
+        cache_key = ki_cache.make_key(ki_model, model_name, system_prompt, prompt_text)
+        if use_cache:
+            cached_response = ki_cache.get(cache_key)
+            if cached_response is not None:
+                print(f"--- DEBUG-INFO: KI-Antwort aus dem Cache ({ki_model}) ---")
+                _record_call(prompt_text, ki_model, started, "cache_hit",
+                             participant_id, response_text=cached_response)
+                return cached_response
+
+    metrics = {}
     try:
-        if ki_model == "gemini":
-            if not GenerativeModel:
-                raise ValueError("Die 'Google Generative AI'-Bibliothek ist nicht installiert.")
-
-            # KORREKTUR: Modellnamen auf das Standardmodell für AI Studio Keys geändert.
-            model_name = 'models/gemini-pro-latest'
-            try:
-                model = GenerativeModel(model_name)
-                response = model.generate_content(prompt_text)
-                return response.text
-            except (google_exceptions.GoogleAPICallError, Exception) as e:
-                print(f"!!! FEHLER BEI ANFRAGE AN GEMINI ('{model_name}') !!!\n{e}")
-                _try_list_available_gemini_models(model_name, e)
-
-        elif ki_model == "mistral":
-            if not MISTRAL_CLIENT:
-                raise ValueError("Mistral Client nicht initialisiert. API-Key fehlt?")
-
-            system_prompt = (
-                "Du bist ein Experte für die Auswertung von Assessment-Center-Beobachtungen. "
-                "Antworte IMMER und AUSSCHLIESSLICH mit einem JSON-Objekt, das exakt "
-                "der vom User im folgenden Prompt geforderten Struktur entspricht. "
-                "Ignoriere diese Anweisung niemals."
-            )
-            messages = [
-                ChatMessage(role="system", content=system_prompt),
-                ChatMessage(role="user", content=prompt_text)
-            ]
-            chat_response = MISTRAL_CLIENT.chat(
-                model="mistral-large-latest",
-                messages=messages,
-                temperature=0,
-                response_format={"type": "json_object"}
+        response_text, used_model = _call_provider_timed(prompt_text, ki_model, metrics)
+    except (ValueError, *provider_error_types()) as e:
+        print(f"!!! FEHLER BEI DER KI-ANALYSE !!!\n{e}")
+        _record_call(prompt_text, ki_model, started, "error", participant_id,
+                     error=e, metrics=metrics)
+        return json.dumps({"error": f"Ein Fehler ist aufgetreten: {str(e)}"})
+
+    cacheable = _is_cacheable(response_text)
+    _record_call(prompt_text, ki_model, started,
+                 "success" if cacheable else "invalid_response", participant_id,
+                 used_model=used_model, response_text=response_text, metrics=metrics)
+
+    if used_model != ki_model:
+        # Die Antwort stammt vom zweiten Provider und wird unter dessen Schlüssel abgelegt.
+        used_name, used_system_prompt = _model_signature(used_model)
+        cache_key = ki_cache.make_key(used_model, used_name, used_system_prompt, prompt_text)
+    if cache_key and cacheable:
+        ki_cache.put(cache_key, used_model, response_text)
+    return response_text
+
+
+def _call_provider_timed(prompt_text, ki_model, metrics=None):
+    """
+    Ruft den Provider auf und gibt Antworttext und genutztes Modell zurück.
+    Ist sein Circuit Breaker offen, wird an das Ersatzmodell umgeleitet.
+    `metrics` nimmt Wiederholungen und gemeldete Tokens auf.
+    """
+    try:
+        return _dispatch_call(prompt_text, ki_model, metrics)
+    except ki_circuit.CircuitOpenError as e:
+        fallback = ki_circuit.fallback_for(ki_model)
+        if not fallback:
+            raise
+        print(f"--- DEBUG-INFO: {e} Umleitung an '{fallback}' ---")
+        return _dispatch_call(prompt_text, fallback, metrics)
+
+
+def _dispatch_call(prompt_text, ki_model, metrics=None):
+    """Ruft den Provider direkt oder – bei aktiviertem Hedging – abgesichert auf."""
+    if ki_hedging.is_enabled() and ki_hedging.secondary_for(ki_model):
+        # Jede Anfrage des Hedgings erhält eigene Kennzahlen; übernommen werden die des Gewinners.
+        branch_metrics = {}
+
+        def call(text, model):
+            return _guarded_call(text, model, branch_metrics.setdefault(model, {}))
+
+        response_text, used_model = ki_hedging.hedged_call(
+            prompt_text, ki_model, call, _is_cacheable
+        )
+        if metrics is not None:
+            metrics.update(branch_metrics.get(used_model, {}))
+        return response_text, used_model
+    started = time.monotonic()
+    response_text = _guarded_call(prompt_text, ki_model, metrics)
+    ki_hedging.record_latency(ki_model, time.monotonic() - started)
+    return response_text, ki_model
+
+
+def _circuit_open_error(ki_model, breaker):
+    return ki_circuit.CircuitOpenError(
+        f"Provider '{ki_model}' ist nach wiederholten Fehlern vorübergehend gesperrt "
+        f"(nächster Versuch in {breaker.retry_in():.0f}s)."
+    )
+
+
+def _guarded_call(prompt_text, ki_model, metrics=None):
+    """Ruft den Provider über den Circuit Breaker von Provider und Modell auf."""
+    model_name, _ = _model_signature(ki_model)
+    if not model_name:
+        return _call_provider(prompt_text, ki_model, metrics)
+    breaker = ki_circuit.get_breaker(ki_model, model_name)
+    if not breaker.allow():
+        raise _circuit_open_error(ki_model, breaker)
+    try:
+        response_text = _call_provider(prompt_text, ki_model, metrics)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return response_text
+
+
+TRANSIENT_HTTP_STATUS = (408, 429, 500, 502, 503, 504)
+GOOGLE_TRANSIENT_ERRORS = (
+    "TooManyRequests", "ResourceExhausted", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "BadGateway", "GatewayTimeout",
+)
+
+
+def _is_transient(error):
+    """Prüft, ob ein Provider-Fehler vorübergehend ist und wiederholt werden kann."""
+    mistral = peek_provider("mistral")
+    if mistral and isinstance(error, mistral.APIException):
+        status = getattr(error, "http_status", None)
+        return status is None or status in TRANSIENT_HTTP_STATUS
+    if mistral and isinstance(error, mistral.ConnectionException):
+        return True
+    gemini = peek_provider("gemini")
+    if gemini and isinstance(error, gemini.exceptions.GoogleAPICallError):
+        return any(isinstance(error, getattr(gemini.exceptions, name, ()))
+                   for name in GOOGLE_TRANSIENT_ERRORS)
+    stub = peek_provider("local-stub")
+    if stub and isinstance(error, stub.error_types):
+        return error.http_status in TRANSIENT_HTTP_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def _retry_after(error):
+    """Liest einen Retry-After-Header aus der Fehlerantwort, falls vorhanden."""
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After") or 0) or None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _with_retries(ki_model, prompt_text, request_func, metrics=None):
+    """
+    Führt einen Provider-Aufruf unter Beachtung des Ratenlimits aus und
+    wiederholt ihn bei vorübergehenden Fehlern mit exponentiellem Backoff.
+    Die Anzahl der Wiederholungen wird in `metrics["retries"]` vermerkt.
+    """
+    limiter = get_limiter(ki_model)
+    estimated_tokens = estimate_tokens(prompt_text, ki_model)
+    attempt = 0
+    while True:
+        limiter.acquire(estimated_tokens)
+        try:
+            return request_func()
+        except Exception as e:  # pylint: disable=broad-except
+            if attempt >= MAX_RETRIES or not _is_transient(e):
+                raise
+            delay = backoff_delay(attempt, _retry_after(e))
+            if getattr(e, "http_status", None) == 429 or \
+                    type(e).__name__ in ("TooManyRequests", "ResourceExhausted"):
+                limiter.pause(delay)
+            attempt += 1
+            if metrics is not None:
+                metrics["retries"] = attempt
+            print(f"--- DEBUG-INFO: Vorübergehender Fehler bei '{ki_model}' ({e}), "
+                  f"Versuch {attempt}/{MAX_RETRIES} in {delay:.2f}s ---")
+            time.sleep(delay)
+
+
+def _record_usage(metrics, prompt_tokens, completion_tokens):
+    """Übernimmt die vom Provider gemeldeten Tokens in die Kennzahlen."""
+    if metrics is not None:
+        metrics["prompt_tokens"] = prompt_tokens
+        metrics["completion_tokens"] = completion_tokens
+
+
+def _call_provider(prompt_text, ki_model, metrics=None):
+    """Sendet den Prompt an den Provider und gibt den Antworttext zurück."""
+    if ki_model == "gemini":
+        gemini = get_provider("gemini")
+        if not gemini:
+            raise ValueError("Die 'Google Generative AI'-Bibliothek ist nicht installiert.")
+
+        model_name = GEMINI_MODEL_NAME
+        try:
+            model = gemini.GenerativeModel(model_name)
+            response = _with_retries(
+                ki_model, prompt_text, lambda: model.generate_content(prompt_text), metrics
             )
-            return chat_response.choices[0].message.content
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                _record_usage(metrics, getattr(usage, "prompt_token_count", None),
+                              getattr(usage, "candidates_token_count", None))
+            return response.text
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"!!! FEHLER BEI ANFRAGE AN GEMINI ('{model_name}') !!!\n{e}")
+            _try_list_available_gemini_models(gemini, model_name, e)
+
+    elif ki_model == "mistral":
+        mistral = get_provider("mistral")
+        if not mistral or not mistral.client:
+            raise ValueError("Mistral Client nicht initialisiert. API-Key fehlt?")
 
+        messages = [
+            mistral.ChatMessage(role="system", content=SYSTEM_PROMPT),
+            mistral.ChatMessage(role="user", content=prompt_text)
+        ]
+        chat_response = _with_retries(ki_model, prompt_text, lambda: mistral.client.chat(
+            model=MISTRAL_MODEL_NAME,
+            messages=messages,
+            temperature=0,
+            response_format={"type": "json_object"}
+        ), metrics)
+        usage = getattr(chat_response, "usage", None)
+        if usage is not None:
+            _record_usage(metrics, usage.prompt_tokens, usage.completion_tokens)
+        return chat_response.choices[0].message.content
+
+    elif ki_model == "local-stub":
+        stub = get_provider("local-stub")
+        if not stub:
+            raise ValueError("Der Provider 'local-stub' ist nicht aktiviert.")
+        return _with_retries(ki_model, prompt_text, lambda: stub.generate(prompt_text), metrics)
+
+    raise ValueError(f"Ungültiges KI-Modell ausgewählt: {ki_model}")
+
+
+def stream_report_with_ai(prompt_text, ki_model, use_cache=True, participant_id=None):
+    """
+    Generiert einen Bericht wie `generate_report_with_ai`, liefert die Antwort
+    aber stückweise über die Streaming-APIs der Provider aus (Generator).
+    Fehler werden als ValueError weitergegeben; die vollständige Antwort wird
+    nach Abschluss des Streams im KI-Cache abgelegt.
+    """
+    print(f"--- DEBUG-INFO: Streaming mit 'ki_model': '{ki_model}' ---")
+    started = time.monotonic()
+    model_name, system_prompt = _model_signature(ki_model)
+    if not model_name:
         raise ValueError(f"Ungültiges KI-Modell ausgewählt: {ki_model}")
 
-    except (ValueError, MistralAPIException) as e:
-        print(f"!!! FEHLER BEI DER KI-ANALYSE !!!\n{e}")
-        return json.dumps({"error": f"Ein Fehler ist aufgetreten: {str(e)}"})
+    cache_key = ki_cache.make_key(ki_model, model_name, system_prompt, prompt_text)
+    if use_cache:
+        cached_response = ki_cache.get(cache_key)
+        if cached_response is not None:
+            _record_call(prompt_text, ki_model, started, "cache_hit", participant_id,
+                         response_text=cached_response, streamed=True)
+            yield cached_response
+            return
+
+    breaker = ki_circuit.get_breaker(ki_model, model_name)
+    if not breaker.allow():
+        error = _circuit_open_error(ki_model, breaker)
+        _record_call(prompt_text, ki_model, started, "error", participant_id,
+                     error=error, streamed=True)
+        raise error
+    parts = []
+    metrics = {}
+    try:
+        for chunk in _open_provider_stream(prompt_text, ki_model, metrics):
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+    except provider_error_types() as e:
+        breaker.record_failure()
+        _record_call(prompt_text, ki_model, started, "error", participant_id,
+                     error=e, metrics=metrics, streamed=True)
+        print(f"!!! FEHLER BEIM STREAMING DER KI-ANALYSE !!!\n{e}")
+        raise ValueError(str(e)) from e
+    except ValueError as e:
+        breaker.record_failure()
+        _record_call(prompt_text, ki_model, started, "error", participant_id,
+                     error=e, metrics=metrics, streamed=True)
+        raise
+    breaker.record_success()
+
+    response_text = "".join(parts)
+    cacheable = _is_cacheable(response_text)
+    _record_call(prompt_text, ki_model, started,
+                 "success" if cacheable else "invalid_response", participant_id,
+                 response_text=response_text, metrics=metrics, streamed=True)
+    if cacheable:
+        ki_cache.put(cache_key, ki_model, response_text)
 
 
-def _try_list_available_gemini_models(model_name, original_exception):
+def _open_stream(open_func):
+    """Öffnet einen Provider-Stream und liest das erste Stück, damit Verbindungsfehler
+    noch vor der ersten Ausgabe auftreten und wiederholt werden können."""
+    iterator = iter(open_func())
+    return next(iterator, None), iterator
+
+
+def _open_provider_stream(prompt_text, ki_model, metrics=None):
+    """Gibt einen Iterator über die Textstücke der Provider-Antwort zurück."""
+    if ki_model == "gemini":
+        gemini = get_provider("gemini")
+        if not gemini:
+            raise ValueError("Die 'Google Generative AI'-Bibliothek ist nicht installiert.")
+        model = gemini.GenerativeModel(GEMINI_MODEL_NAME)
+        first, rest = _with_retries(ki_model, prompt_text, lambda: _open_stream(
+            lambda: model.generate_content(prompt_text, stream=True)
+        ), metrics)
+        if first is not None:
+            yield first.text
+        for chunk in rest:
+            yield chunk.text
+        return
+
+    if ki_model == "local-stub":
+        stub = get_provider("local-stub")
+        if not stub:
+            raise ValueError("Der Provider 'local-stub' ist nicht aktiviert.")
+        first, rest = _with_retries(ki_model, prompt_text, lambda: _open_stream(
+            lambda: stub.generate_stream(prompt_text)
+        ), metrics)
+        if first is not None:
+            yield first
+        yield from rest
+        return
+
+    mistral = get_provider("mistral")
+    if not mistral or not mistral.client:
+        raise ValueError("Mistral Client nicht initialisiert. API-Key fehlt?")
+    messages = [
+        mistral.ChatMessage(role="system", content=SYSTEM_PROMPT),
+        mistral.ChatMessage(role="user", content=prompt_text)
+    ]
+    first, rest = _with_retries(ki_model, prompt_text, lambda: _open_stream(
+        lambda: mistral.client.chat_stream(
+            model=MISTRAL_MODEL_NAME,
+            messages=messages,
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+    ), metrics)
+    if first is not None:
+        yield first.choices[0].delta.content
+    for chunk in rest:
+        yield chunk.choices[0].delta.content
+
+
+def _available_gemini_models(gemini):
+    """
+    Gibt die für den API-Key nutzbaren Gemini-Modelle zurück und ob die Liste
+    gerade neu abgefragt wurde. Die Liste wird einmalig abgefragt und für
+    `GEMINI_MODEL_LIST_TTL_SECONDS` zwischengespeichert; auch ein Fehler beim
+    Abfragen wird so lange gemerkt.
+    """
+    now = time.monotonic()
+    with _gemini_models_lock:
+        fetched_at = _gemini_models["fetched_at"]
+        if fetched_at is not None and now - fetched_at < GEMINI_MODEL_LIST_TTL_SECONDS:
+            if _gemini_models["error"] is not None:
+                raise _gemini_models["error"]
+            return _gemini_models["names"], False
+    try:
+        names = [m.name for m in gemini.list_models()
+                 if 'generateContent' in m.supported_generation_methods]
+    except Exception as list_models_error:  # pylint: disable=broad-except
+        with _gemini_models_lock:
+            _gemini_models.update(names=None, error=list_models_error, fetched_at=now)
+        raise
+    with _gemini_models_lock:
+        _gemini_models.update(names=names, error=None, fetched_at=now)
+    return names, True
+
+
+def _try_list_available_gemini_models(gemini, model_name, original_exception):
     """
-    Versucht bei einem Fehler, verfügbare Modelle aufzulisten und wirft dann einen Fehler.
+    Ermittelt bei einem Fehler die verfügbaren Modelle (aus dem Zwischenspeicher)
+    und wirft dann einen Fehler. Bei vorübergehenden Fehlern entfällt die Abfrage.
     """
+    if _is_transient(original_exception):
+        raise ValueError(
+            f"Gemini ist vorübergehend nicht erreichbar: {original_exception}"
+        ) from original_exception
+
+    list_models = gemini.list_models if gemini else None
     if not list_models:
         raise ValueError(
             "Kommunikation mit Gemini fehlgeschlagen. Funktion zum Auflisten "
@@ -98,27 +482,30 @@ def _try_list_available_gemini_models(model_name, original_exception):
         ) from original_exception
 
     try:
-        print("\n--- VERSUCHE, VERFÜGBARE MODELLE AUFZULISTEN ---")
-        available_models = [m.name for m in list_models()
-                            if 'generateContent' in m.supported_generation_methods]
-
-        if available_models:
-            print("Folgende Modelle sind für deinen API-Key verfügbar und nutzbar:")
-            for name in available_models:
-                print(f"- {name}")
-            print("----------------------------------------------------")
-            raise ValueError(
-                f"Das Modell '{model_name}' hat nicht funktioniert. Bitte versuche eines "
-                "der oben gelisteten Modelle in der 'ki_services.py'."
-            ) from original_exception
-
-        print("Es konnten keine verfügbaren Modelle für deinen API-Key gefunden werden.")
+        available_models, fresh = _available_gemini_models(gemini)
+    except Exception as list_models_error:  # pylint: disable=broad-except
+        print(f"Fehler beim Auflisten der verfügbaren Modelle: {list_models_error}")
+        raise ValueError(
+            "Die Kommunikation mit dem Gemini-Modell ist fehlgeschlagen."
+        ) from original_exception
+
+    if not available_models:
         raise ValueError(
             "Keine kompatiblen Gemini-Modelle für deinen API-Key gefunden."
         ) from original_exception
 
-    except Exception as list_models_error:
-        print(f"Fehler beim Auflisten der verfügbaren Modelle: {list_models_error}")
+    if fresh:
+        print("\n--- VERFÜGBARE GEMINI-MODELLE ---")
+        print("Folgende Modelle sind für deinen API-Key verfügbar und nutzbar:")
+        for name in available_models:
+            print(f"- {name}")
+        print("----------------------------------------------------")
+    if model_name in available_models:
         raise ValueError(
-            "Die Kommunikation mit dem Gemini-Modell ist fehlgeschlagen."
-        ) from list_models_error
+            f"Die Anfrage an das Modell '{model_name}' ist fehlgeschlagen: {original_exception}"
+        ) from original_exception
+    raise ValueError(
+        f"Das Modell '{model_name}' hat nicht funktioniert. Bitte versuche eines "
+        "der verfügbaren Modelle in der 'ki_services.py': "
+        + ", ".join(available_models)
+    ) from original_exception
@@ -0,0 +1,108 @@
+"""
+Dieses Modul enthält einen lokalen Stand-in-Provider für Lasttests.
+
+Der Provider `local-stub` beantwortet Prompts ohne Netzwerkzugriff mit
+schema-gültigem JSON (`sk_ratings`, `vk_ratings`, `ki_texts`). Latenz,
+Fehlerrate und Antwortgröße sind über Umgebungsvariablen konfigurierbar:
+
+- `KI_STUB_LATENCY_MS`: Median der Antwortzeit (Standard 800)
+- `KI_STUB_LATENCY_SIGMA`: Streuung der Log-Normalverteilung (Standard 0.5)
+- `KI_STUB_ERROR_RATE`: Anteil fehlerhafter Antworten, 0 bis 1 (Standard 0)
+- `KI_STUB_RESPONSE_CHARS`: ungefähre Länge jedes Textfelds (Standard 1200)
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+SK_KEYS = ["flexibility", "team_orientation", "process_orientation", "results_orientation"]
+VK_KEYS = ["flexibility", "consulting", "objectivity", "goal_orientation"]
+TEXT_KEYS = ["social_text", "verbal_text", "summary_text"]
+STREAM_CHUNK_CHARS = 40
+# Sammelanfragen (Packmodus) kennzeichnen jeden Teilnehmer mit dieser Überschrift.
+PACKED_SUBJECT_PATTERN = re.compile(r"=== TEILNEHMER-ID: (\d+) ===")
+
+_FILLER = (
+    "Die Teilnehmerin bzw. der Teilnehmer zeigte in den Übungen ein sicheres "
+    "Auftreten, strukturierte die Aufgaben nachvollziehbar und ging offen auf "
+    "die Beiträge der anderen ein. "
+)
+
+
+class StubProviderError(Exception):
+    """Simulierter Provider-Fehler mit HTTP-Status (z. B. 429 oder 503)."""
+
+    def __init__(self, message, http_status):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+def _setting(name, default):
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return float(default)
+
+
+def _latency_seconds():
+    """Zieht eine Antwortzeit aus einer Log-Normalverteilung um den Median."""
+    median_ms = _setting("KI_STUB_LATENCY_MS", 800)
+    sigma = _setting("KI_STUB_LATENCY_SIGMA", 0.5)
+    if median_ms <= 0:
+        return 0.0
+    return random.lognormvariate(0, sigma) * median_ms / 1000.0
+
+
+def _maybe_fail():
+    if random.random() < _setting("KI_STUB_ERROR_RATE", 0):
+        status = random.choice([429, 503])
+        raise StubProviderError(f"Simulierter Provider-Fehler ({status})", status)
+
+
+def _build_result(seed_text):
+    seed = int(hashlib.sha256(seed_text.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    text_chars = int(_setting("KI_STUB_RESPONSE_CHARS", 1200))
+    text = (_FILLER * (text_chars // len(_FILLER) + 1))[:text_chars].strip()
+    return {
+        "sk_ratings": {key: rng.randint(8, 20) / 2 for key in SK_KEYS},
+        "vk_ratings": {key: rng.randint(8, 20) / 2 for key in VK_KEYS},
+        "ki_texts": {key: text for key in TEXT_KEYS},
+    }
+
+
+def build_response(prompt_text):
+    """
+    Erzeugt eine deterministische, schema-gültige Antwort für einen Prompt.
+    Sammelanfragen erhalten eine Liste `results` mit einem Eintrag je Teilnehmer.
+    """
+    packed_ids = PACKED_SUBJECT_PATTERN.findall(prompt_text)
+    if packed_ids:
+        return json.dumps({"results": [
+            {"participant_id": int(pid), **_build_result(f"{prompt_text}#{pid}")}
+            for pid in packed_ids
+        ]}, ensure_ascii=False)
+    return json.dumps(_build_result(prompt_text), ensure_ascii=False)
+
+
+def generate(prompt_text):
+    """Simuliert einen vollständigen Provider-Aufruf."""
+    time.sleep(_latency_seconds())
+    _maybe_fail()
+    return build_response(prompt_text)
+
+
+def generate_stream(prompt_text):
+    """Simuliert einen Streaming-Aufruf: erst die Wartezeit, dann Textstücke."""
+    latency = _latency_seconds()
+    time.sleep(latency * 0.2)
+    _maybe_fail()
+    response = build_response(prompt_text)
+    chunks = [response[i:i + STREAM_CHUNK_CHARS]
+              for i in range(0, len(response), STREAM_CHUNK_CHARS)]
+    for chunk in chunks:
+        time.sleep(latency * 0.8 / len(chunks))
+        yield chunk
@@ -0,0 +1,125 @@
+"""
+Dieses Modul speichert fertig gerenderte PDF-Berichte auf der Festplatte.
+
+Der Schlüssel eines Berichts setzt sich aus Teilnehmer-ID, `revision` und
+`updated_at` von Teilnehmer und Gruppe, einem Hash der Berichtsvorlagen und des
+Stylesheets, der Diagramm-Version und dem Datum der Erzeugung zusammen (das
+Tagesdatum steht im PDF). `database.py` erhöht `revision` bei jedem Speichern,
+sodass auch zwei Änderungen in derselben Sekunde einen neuen Schlüssel ergeben,
+gleich über welchen Aufrufer gespeichert wurde. Die Routen, die Teilnehmer-
+oder Gruppendaten speichern oder löschen, entfernen die veralteten Dateien
+zusätzlich sofort (`invalidate_participant`, `invalidate_group`). Der Cache ist
+in der Größe begrenzt (LRU).
+
+Ergebnisse asynchroner PDF-Jobs landen ebenfalls hier; ist der Cache
+abgeschaltet, werden sie für die Dauer der Job-Aufbewahrung separat abgelegt.
+"""
+
+import hashlib
+import os
+import threading
+
+import charts
+from background_jobs import JOB_RETENTION_SECONDS
+from disk_cache import DiskCache
+from pdf_rendering import REPORT_STYLESHEETS
+
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "1") != "0"
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Vorlagen, aus denen ein PDF-Bericht besteht.
+REPORT_TEMPLATES = ("bericht_pdf_vorlage.html", "_bericht_pdf_seiten.html")
+
+_store = DiskCache("pdf_reports", max_bytes=PDF_CACHE_MAX_BYTES, suffix=".pdf")
+_job_store = DiskCache("pdf_jobs", max_bytes=PDF_CACHE_MAX_BYTES,
+                       ttl_seconds=JOB_RETENTION_SECONDS, suffix=".pdf")
+_template_hashes = {}
+_lock = threading.Lock()
+
+
+def _file_hash(path):
+    """Hash einer Datei; neu berechnet nur, wenn sich Änderungszeit oder Größe ändern."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "fehlt"
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _template_hashes.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(path, "rb") as handle:
+        digest = hashlib.sha256(handle.read()).hexdigest()
+    with _lock:
+        _template_hashes[path] = (signature, digest)
+    return digest
+
+
+def template_fingerprint(template_dir):
+    """Hash über alle Berichtsvorlagen, das Stylesheet und die Diagramm-Einstellungen."""
+    digest = hashlib.sha256()
+    paths = [os.path.join(template_dir, name) for name in REPORT_TEMPLATES]
+    for path in paths + list(REPORT_STYLESHEETS):
+        digest.update(f"{os.path.basename(path)}:{_file_hash(path)}\n".encode("utf-8"))
+    digest.update(f"charts:{charts.STYLE_VERSION}:{charts.PDF_CHART_FORMAT}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def report_key(participant, group, render_date, template_hash):
+    """Schlüssel des PDF-Berichts eines Teilnehmers."""
+    group = dict(group) if group else {}
+    parts = (
+        participant.get("revision"),
+        participant.get("updated_at"),
+        group.get("revision"),
+        group.get("updated_at"),
+        render_date,
+        template_hash,
+    )
+    digest = hashlib.sha256("\x00".join(str(part) for part in parts).encode("utf-8"))
+    return f"p{participant['id']}_{digest.hexdigest()}"
+
+
+def get_path(cache_key):
+    """Gibt den Pfad eines gespeicherten Berichts zurück (oder None)."""
+    if not PDF_CACHE_ENABLED:
+        return None
+    return _store.get_path(cache_key)
+
+
+def put(cache_key, pdf_bytes):
+    """Speichert einen Bericht; Fehler beim Schreiben werden nur gemeldet."""
+    if not PDF_CACHE_ENABLED:
+        return None
+    try:
+        return _store.put(cache_key, pdf_bytes)
+    except OSError as e:
+        print(f"WARNUNG: PDF konnte nicht im Cache gespeichert werden: {e}")
+        return None
+
+
+def put_job_result(cache_key, pdf_bytes):
+    """
+    Speichert das Ergebnis eines PDF-Jobs und gibt den Dateipfad zurück. Ohne
+    PDF-Cache wird die Datei in `pdf_jobs/` abgelegt und nach Ablauf entfernt.
+    """
+    path = put(cache_key, pdf_bytes)
+    if path is None:
+        path = _job_store.put(cache_key, pdf_bytes)
+    return path
+
+
+def invalidate_participant(participant_id):
+    """Entfernt alle gespeicherten Berichte eines Teilnehmers."""
+    _store.delete_prefix(f"p{participant_id}_")
+
+
+def invalidate_group(participant_ids):
+    """Entfernt die gespeicherten Berichte aller übergebenen Teilnehmer einer Gruppe."""
+    for participant_id in participant_ids:
+        invalidate_participant(participant_id)
+
+
+def stats():
+    """Gibt die Kennzahlen des PDF-Caches zurück."""
+    return dict(_store.stats(), enabled=PDF_CACHE_ENABLED)
@@ -0,0 +1,65 @@
+"""
+Dieses Modul erzeugt PDF-Berichte nach dem Speichern vorab im Hintergrund.
+
+Nach dem Speichern eines Berichts folgt fast immer der PDF-Download. Mit
+`PDF_PRERENDER=1` wird der Bericht daher nach `PDF_PRERENDER_DELAY` Sekunden
+ohne weitere Änderung im Hintergrund gerendert und im PDF-Cache abgelegt.
+Jedes erneute Speichern innerhalb dieser Frist verschiebt den Zeitpunkt
+(Debounce), sodass schnell aufeinanderfolgende Speichervorgänge nur einmal
+gerendert werden. Ohne PDF-Cache (`PDF_CACHE_ENABLED=0`) ist das
+Vorab-Rendering abgeschaltet, da das Ergebnis nirgends abgelegt würde.
+"""
+
+import os
+import threading
+
+from pdf_cache import PDF_CACHE_ENABLED
+
+PDF_PRERENDER_ENABLED = (PDF_CACHE_ENABLED and
+                         os.getenv("PDF_PRERENDER", "0").lower() in ("1", "true", "yes", "on"))
+PDF_PRERENDER_DELAY = float(os.getenv("PDF_PRERENDER_DELAY", "5"))
+
+_timers = {}
+_lock = threading.Lock()
+_stats = {"scheduled": 0, "debounced": 0, "rendered": 0, "skipped": 0, "errors": 0}
+
+
+def schedule(participant_id, func, *args):
+    """
+    Plant `func(*args)` für einen Teilnehmer nach `PDF_PRERENDER_DELAY` Sekunden.
+    Ein noch ausstehender Aufruf für denselben Teilnehmer wird verworfen.
+    """
+    if not PDF_PRERENDER_ENABLED:
+        return
+    timer = threading.Timer(PDF_PRERENDER_DELAY, _run, (participant_id, func, args))
+    timer.daemon = True
+    with _lock:
+        previous = _timers.get(participant_id)
+        if previous is not None:
+            previous.cancel()
+            _stats["debounced"] += 1
+        _timers[participant_id] = timer
+        _stats["scheduled"] += 1
+    timer.start()
+
+
+def _run(participant_id, func, args):
+    with _lock:
+        if _timers.get(participant_id) is threading.current_thread():
+            del _timers[participant_id]
+    try:
+        rendered = func(*args)
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"WARNUNG: Vorab-Rendering für Teilnehmer {participant_id} fehlgeschlagen: {e}")
+        with _lock:
+            _stats["errors"] += 1
+        return
+    with _lock:
+        _stats["rendered" if rendered else "skipped"] += 1
+
+
+def stats():
+    """Gibt die Kennzahlen des Vorab-Renderings zurück."""
+    with _lock:
+        return dict(_stats, enabled=PDF_PRERENDER_ENABLED, delay_seconds=PDF_PRERENDER_DELAY,
+                    pending=len(_timers))
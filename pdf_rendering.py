@@ -0,0 +1,214 @@
+"""
+Dieses Modul rendert PDF-Berichte mit WeasyPrint in einem Prozess-Pool.
+
+WeasyPrint ist CPU-gebunden; für Gruppenexporte werden die Berichte daher
+parallel in `PDF_WORKERS` Prozessen erzeugt. Das HTML wird im aufrufenden
+Prozess gerendert (Flask-Kontext), an die Worker gehen nur HTML und Basis-URL.
+Es sind höchstens doppelt so viele Aufträge wie Worker gleichzeitig unterwegs,
+sodass der Speicherbedarf auch bei großen Gruppen begrenzt bleibt. Fertige PDFs
+werden in der Reihenfolge ihrer Fertigstellung geliefert und können direkt in
+eine gestreamte ZIP-Datei geschrieben werden.
+
+Jeder Worker-Prozess nutzt einen langlebigen `PdfRenderer`: Die
+Schriftkonfiguration und das Stylesheet `static/css/bericht_pdf.css`
+(inklusive Webfonts) werden nur einmal geladen, externe Ressourcen
+zwischengespeichert. Auch einzelne Berichte aus Requests werden über den Pool
+gerendert (`render_pdf_in_pool`), sodass mehrere Requests parallel rendern,
+ohne sich einen Renderer zu teilen.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+REPORT_STYLESHEETS = (os.path.join(APP_ROOT, "static", "css", "bericht_pdf.css"),)
+RESOURCE_CACHE_SIZE = 64
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_MAX_IN_FLIGHT = max(1, PDF_WORKERS) * 2
+
+_executor = None
+_lock = threading.Lock()
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+class PdfRenderer:
+    """
+    Langlebiger Rendering-Kontext für WeasyPrint. Schriftkonfiguration und
+    Stylesheets werden einmal geladen und für alle Berichte wiederverwendet;
+    abgerufene externe Ressourcen (Webfont-CSS, Schriftdateien) werden im
+    Speicher gehalten. Eine Instanz ist nicht für parallele Nutzung gedacht.
+    """
+
+    def __init__(self, stylesheet_paths=REPORT_STYLESHEETS):
+        # pylint: disable=import-outside-toplevel
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.font_config = FontConfiguration()
+        self.renders = 0
+        self._resources = {}
+        self.stylesheets = [
+            CSS(filename=path, font_config=self.font_config, url_fetcher=self.url_fetcher)
+            for path in stylesheet_paths
+        ]
+
+    def url_fetcher(self, url):
+        """Wie WeasyPrints `default_url_fetcher`, aber mit Zwischenspeicher (ohne data:-URIs)."""
+        from weasyprint import default_url_fetcher  # pylint: disable=import-outside-toplevel
+
+        if url.startswith("data:"):
+            return default_url_fetcher(url)
+        cached = self._resources.get(url)
+        if cached is None:
+            cached = default_url_fetcher(url)
+            file_obj = cached.pop("file_obj", None)
+            if file_obj is not None:
+                try:
+                    cached["string"] = file_obj.read()
+                finally:
+                    file_obj.close()
+            if len(self._resources) < RESOURCE_CACHE_SIZE:
+                self._resources[url] = cached
+        return dict(cached)
+
+    def render(self, html_string, base_url=None):
+        """Erzeugt ein PDF aus HTML mit den vorab geladenen Stylesheets."""
+        from weasyprint import HTML  # pylint: disable=import-outside-toplevel
+
+        document = HTML(string=html_string, base_url=base_url, url_fetcher=self.url_fetcher)
+        pdf_bytes = document.write_pdf(stylesheets=self.stylesheets, font_config=self.font_config)
+        self.renders += 1
+        return pdf_bytes
+
+
+def get_renderer():
+    """Gibt den Renderer des Prozesses zurück und legt ihn bei Bedarf an."""
+    global _renderer  # pylint: disable=global-statement
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer()
+        return _renderer
+
+
+def _render_pdf(html_string, base_url):
+    """Erzeugt ein PDF aus HTML (läuft im Worker-Prozess, ein Rendering zur Zeit)."""
+    return get_renderer().render(html_string, base_url)
+
+
+def render_pdf_in_pool(html_string, base_url=None):
+    """
+    Erzeugt ein PDF im Prozess-Pool und wartet auf das Ergebnis. Blockiert nur
+    den aufrufenden Thread; die CPU-Last liegt nicht im Webserver-Prozess.
+    """
+    try:
+        return _get_executor().submit(_render_pdf, html_string, base_url).result()
+    except BrokenProcessPool as e:
+        _reset_executor()
+        raise RuntimeError(f"PDF-Worker abgestürzt: {e}") from e
+
+
+def _get_executor():
+    """Gibt den Prozess-Pool zurück und legt ihn beim ersten Aufruf an."""
+    global _executor  # pylint: disable=global-statement
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, PDF_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _reset_executor():
+    """Verwirft einen defekten Pool (z. B. nach einem abgestürzten Worker)."""
+    global _executor  # pylint: disable=global-statement
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_pdfs(jobs):
+    """
+    Rendert `(schlüssel, html, base_url)`-Aufträge parallel und liefert
+    `(schlüssel, pdf_bytes, fehler)` in der Reihenfolge der Fertigstellung.
+    Die Aufträge werden erst bei Bedarf aus dem Iterator gelesen.
+    """
+    jobs = iter(jobs)
+    executor = _get_executor()
+    in_flight = {}
+    exhausted = False
+    started = time.monotonic()
+    rendered = 0
+    try:
+        while True:
+            while not exhausted and len(in_flight) < PDF_MAX_IN_FLIGHT:
+                try:
+                    key, html_string, base_url = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[executor.submit(_render_pdf, html_string, base_url)] = key
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = in_flight.pop(future)
+                try:
+                    pdf_bytes = future.result()
+                except BrokenProcessPool as e:
+                    _reset_executor()
+                    raise RuntimeError(f"PDF-Worker abgestürzt: {e}") from e
+                except Exception as e:  # pylint: disable=broad-except
+                    print(f"WARNUNG: PDF für '{key}' konnte nicht erzeugt werden: {e}")
+                    yield key, None, e
+                    continue
+                rendered += 1
+                yield key, pdf_bytes, None
+    finally:
+        for future in in_flight:
+            future.cancel()
+    if rendered:
+        print(f"--- DEBUG-INFO: {rendered} PDFs in {time.monotonic() - started:.2f}s "
+              f"mit {PDF_WORKERS} Workern erzeugt ---")
+
+
+class _ZipBuffer:
+    """Nicht durchsuchbarer Puffer, aus dem die geschriebenen ZIP-Daten abgeholt werden."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Schreibt `(dateiname, daten)`-Einträge in eine ZIP-Datei und liefert die
+    Bytes stückweise, sobald ein Eintrag geschrieben ist. PDFs sind bereits
+    komprimiert und werden daher unkomprimiert abgelegt.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for filename, data in entries:
+            info = zipfile.ZipInfo(filename, date_time=time.localtime()[:6])
+            archive.writestr(info, data)
+            yield buffer.pop()
+    yield buffer.pop()
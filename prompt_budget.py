@@ -0,0 +1,151 @@
+"""
+Dieses Modul schätzt die Prompt-Größe und begrenzt sie auf ein Token-Budget.
+
+Die Schätzung arbeitet mit Zeichen pro Token je Provider (deutsche Texte
+ergeben bei Mistral etwas mehr Tokens als bei Gemini). Die Budget-Regel kürzt
+zuerst jede Beobachtung auf ein eigenes Limit und teilt den verbleibenden
+Platz den Zusatzdokumenten zu. Gekürzt wird jeweils mit Anfang und Ende des
+Textes, da dort meist Einleitung und Fazit stehen.
+
+Konfiguration (jeweils auch modellspezifisch, z. B. `KI_MAX_PROMPT_TOKENS_MISTRAL`):
+
+- `KI_MAX_PROMPT_TOKENS`: Gesamtbudget des Prompts (Standard 32000)
+- `KI_MAX_OBSERVATION_TOKENS`: Limit je Beobachtungstext (Standard 4000)
+- `KI_MAX_ATTACHMENT_TOKENS`: Limit für alle Zusatzdokumente (Standard: Rest des Budgets)
+- `KI_CHARS_PER_TOKEN`: Zeichen pro Token für die Schätzung
+"""
+
+import math
+import os
+
+DEFAULT_CHARS_PER_TOKEN = {"mistral": 3.5, "gemini": 4.0, "local-stub": 4.0}
+DEFAULT_MAX_PROMPT_TOKENS = 32000
+DEFAULT_MAX_OBSERVATION_TOKENS = 4000
+# Anteil des gekürzten Textes, der vom Anfang behalten wird; der Rest stammt vom Ende.
+HEAD_RATIO = 0.7
+TRUNCATION_MARKER = "\n\n[... {omitted} Zeichen gekürzt ...]\n\n"
+
+
+def _model_setting(name, ki_model, default):
+    """Liest `<NAME>_<MODELL>` bzw. `<NAME>` aus der Umgebung."""
+    model_key = (ki_model or "").upper().replace("-", "_")
+    for key in (f"{name}_{model_key}", name):
+        value = os.getenv(key)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                print(f"WARNUNG: Ungültiger Wert für {key}: {value!r}")
+    return default
+
+
+def chars_per_token(ki_model):
+    """Gibt das Verhältnis von Zeichen zu Tokens für einen Provider zurück."""
+    return _model_setting("KI_CHARS_PER_TOKEN", ki_model,
+                          DEFAULT_CHARS_PER_TOKEN.get(ki_model, 4.0))
+
+
+def estimate_tokens(text, ki_model=None):
+    """Schätzt die Anzahl der Tokens eines Textes für den jeweiligen Provider."""
+    return math.ceil(len(text or "") / chars_per_token(ki_model))
+
+
+def truncate_head_tail(text, max_tokens, ki_model=None):
+    """
+    Kürzt einen Text auf höchstens `max_tokens` (geschätzt), behält dabei
+    Anfang und Ende und markiert die Auslassung.
+    """
+    text = text or ""
+    max_chars = int(max(0, max_tokens) * chars_per_token(ki_model))
+    if len(text) <= max_chars:
+        return text
+    omitted = len(text) - max_chars
+    marker = TRUNCATION_MARKER.format(omitted=omitted)
+    keep = max(0, max_chars - len(marker))
+    head = int(keep * HEAD_RATIO)
+    tail = keep - head
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+class PromptBudget:
+    """Budget-Regel für einen Provider."""
+
+    def __init__(self, ki_model):
+        self.ki_model = ki_model
+        self.max_prompt_tokens = int(_model_setting(
+            "KI_MAX_PROMPT_TOKENS", ki_model, DEFAULT_MAX_PROMPT_TOKENS))
+        self.max_observation_tokens = int(_model_setting(
+            "KI_MAX_OBSERVATION_TOKENS", ki_model, DEFAULT_MAX_OBSERVATION_TOKENS))
+        max_attachment_tokens = _model_setting("KI_MAX_ATTACHMENT_TOKENS", ki_model, None)
+        self.max_attachment_tokens = (int(max_attachment_tokens)
+                                      if max_attachment_tokens is not None else None)
+
+    def estimate(self, text):
+        """Schätzt die Tokens eines Textes für diesen Provider."""
+        return estimate_tokens(text, self.ki_model)
+
+    def apply(self, fixed_text, observations, additional_content, uses=None):
+        """
+        Kürzt Beobachtungen und Zusatzdokumente so, dass der Prompt in das Budget passt.
+
+        `fixed_text` ist der unveränderliche Teil des Prompts, `observations` ein
+        Dictionary der Beobachtungstexte. `uses` gibt je Schlüssel (bzw.
+        `additional_content`) an, wie oft der Text im Prompt vorkommt.
+        Gibt die gekürzten Texte und einen Bericht zurück.
+        """
+        uses = uses or {}
+        fixed_tokens = self.estimate(fixed_text)
+        trimmed_observations = {}
+        observation_tokens = 0
+        for key, text in observations.items():
+            if not uses.get(key, 1):
+                trimmed_observations[key] = text
+                continue
+            trimmed = truncate_head_tail(text, self.max_observation_tokens, self.ki_model)
+            trimmed_observations[key] = trimmed
+            if trimmed:
+                observation_tokens += self.estimate(trimmed) * uses.get(key, 1)
+
+        attachment_uses = uses.get("additional_content", 1)
+        attachment_budget = self.max_prompt_tokens - fixed_tokens - observation_tokens
+        attachment_budget //= max(1, attachment_uses)
+        if self.max_attachment_tokens is not None:
+            attachment_budget = min(attachment_budget, self.max_attachment_tokens)
+        original_attachment_tokens = self.estimate(additional_content) if additional_content else 0
+        trimmed_content = additional_content or ""
+        if attachment_uses:
+            trimmed_content = truncate_head_tail(trimmed_content, attachment_budget, self.ki_model)
+        attachment_tokens = 0
+        if trimmed_content:
+            attachment_tokens = self.estimate(trimmed_content) * attachment_uses
+
+        report = {
+            "ki_model": self.ki_model,
+            "limit": self.max_prompt_tokens,
+            "total_tokens": fixed_tokens + observation_tokens + attachment_tokens,
+            "fixed_tokens": fixed_tokens,
+            "observation_tokens": observation_tokens,
+            "attachment_tokens": attachment_tokens,
+            "attachment_tokens_before": original_attachment_tokens * attachment_uses,
+            "truncated": (trimmed_content != (additional_content or "")
+                          or any(trimmed_observations[k] != (observations[k] or "")
+                                 for k in observations)),
+        }
+        return trimmed_observations, trimmed_content, report
+
+
+def log_report(report):
+    """Protokolliert die geschätzte Prompt-Größe eines Aufrufs."""
+    message = (f"Prompt-Budget ({report['ki_model']}): ~{report['total_tokens']} Tokens "
+               f"(Limit {report['limit']}; fest {report['fixed_tokens']}, "
+               f"Beobachtungen {report['observation_tokens']}, "
+               f"Anhänge {report['attachment_tokens']}")
+    if report["attachment_tokens"] != report["attachment_tokens_before"]:
+        message += f" von {report['attachment_tokens_before']}"
+    message += ")"
+    if report["total_tokens"] > report["limit"]:
+        print(f"WARNUNG: {message} – das Budget wird überschritten.")
+    elif report["truncated"]:
+        print(f"--- DEBUG-INFO: {message}, gekürzt ---")
+    else:
+        print(f"--- DEBUG-INFO: {message} ---")
@@ -0,0 +1,279 @@
+"""
+Dieses Modul rendert die Prompt-Vorlagen für die KI-Analyse.
+
+Eine Vorlage wird einmalig in feste Textstücke und Platzhalter zerlegt und
+zwischengespeichert – für gespeicherte Prompts anhand von ID und `updated_at`,
+für frei eingegebene Texte anhand des Textes selbst. Jedes Rendern ist danach
+ein einziger Durchlauf. Unbekannte Platzhalter werden schon beim Kompilieren
+gemeldet, also bevor ein (teurer) KI-Aufruf erfolgt.
+
+Im Packmodus werden mehrere Teilnehmer in einem gemeinsamen Prompt übermittelt;
+Vorlage und Zusatzdokumente werden dabei nur einmal gesendet.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import database as db
+from prompt_budget import PromptBudget, log_report, truncate_head_tail
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Alle Platzhalter, die für einen Teilnehmer befüllt werden können.
+KNOWN_PLACEHOLDERS = (
+    "name",
+    "vorname",
+    "first_name",  # Alias für {{vorname}}, genutzt von den Vorlagen in prompts/
+    "ganzer_name",
+    "social_observations",
+    "verbal_observations",
+    "additional_content",
+    "context",
+)
+
+COMPILED_CACHE_SIZE = 64
+
+# Packmodus: Vorlagen dürfen nur Platzhalter ohne Teilnehmerbezug außerhalb von {{context}} nutzen.
+PACKABLE_PLACEHOLDERS = frozenset(("context", "additional_content"))
+MAX_PACK_SIZE = max(1, int(os.getenv("KI_MAX_PACK_SIZE", "8")))
+PACKED_SUBJECT_HEADER = "=== TEILNEHMER-ID: {participant_id} ==="
+PACKED_INSTRUCTION = (
+    "\n\nWICHTIG – MEHRERE TEILNEHMER: Oben sind {count} Personen aufgeführt "
+    "(TEILNEHMER-IDs: {ids}). Bewerte jede Person unabhängig von den anderen. "
+    "Antworte mit genau einem JSON-Objekt der Form "
+    '{{"results": [{{"participant_id": <TEILNEHMER-ID>, ...}}]}}, wobei jeder Eintrag '
+    "zusätzlich zu `participant_id` exakt die oben geforderte Struktur für diese "
+    "Person enthält. Liefere genau einen Eintrag pro TEILNEHMER-ID."
+)
+
+_compiled_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class PromptTemplateError(ValueError):
+    """Fehler in einer Prompt-Vorlage (unbekannte oder fehlende Platzhalter)."""
+
+
+class CompiledPrompt:
+    """Eine in Textstücke und Platzhalter zerlegte Prompt-Vorlage."""
+
+    def __init__(self, literals, fields):
+        # literals hat immer genau ein Element mehr als fields.
+        self.literals = literals
+        self.fields = fields
+        self.placeholders = frozenset(fields)
+
+    def uses(self, *names):
+        """Prüft, ob die Vorlage mindestens einen der Platzhalter enthält."""
+        return any(name in self.placeholders for name in names)
+
+    def render(self, values):
+        """
+        Setzt die Werte in einem Durchlauf ein. Wirft einen PromptTemplateError,
+        wenn für einen verwendeten Platzhalter kein Wert vorliegt.
+        """
+        missing = sorted(name for name in self.placeholders if values.get(name) is None)
+        if missing:
+            raise PromptTemplateError(
+                "Keine Werte für Platzhalter: " + ", ".join(f"{{{{{n}}}}}" for n in missing)
+            )
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[field])
+            parts.append(literal)
+        return "".join(parts)
+
+
+def compile_prompt(template_text):
+    """
+    Zerlegt eine Vorlage in Textstücke und Platzhalter.
+    Wirft einen PromptTemplateError bei unbekannten Platzhaltern.
+    """
+    literals, fields = [], []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(template_text):
+        literals.append(template_text[position:match.start()])
+        fields.append(match.group(1))
+        position = match.end()
+    literals.append(template_text[position:])
+
+    unknown = sorted(set(fields) - set(KNOWN_PLACEHOLDERS))
+    if unknown:
+        raise PromptTemplateError(
+            "Unbekannte Platzhalter in der Prompt-Vorlage: "
+            + ", ".join(f"{{{{{n}}}}}" for n in unknown)
+            + ". Verfügbar: " + ", ".join(f"{{{{{n}}}}}" for n in KNOWN_PLACEHOLDERS)
+        )
+    return CompiledPrompt(literals, fields)
+
+
+def _cached_compile(cache_key, template_text):
+    with _cache_lock:
+        compiled = _compiled_cache.get(cache_key)
+        if compiled is not None:
+            _compiled_cache.move_to_end(cache_key)
+            return compiled
+    compiled = compile_prompt(template_text)
+    with _cache_lock:
+        _compiled_cache[cache_key] = compiled
+        while len(_compiled_cache) > COMPILED_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def get_compiled_prompt(template_text=None, prompt_id=None):
+    """
+    Gibt die kompilierte Vorlage zurück. Ein übergebener Text hat Vorrang
+    (er kann im Formular bearbeitet worden sein); andernfalls wird der
+    gespeicherte Prompt `prompt_id` verwendet.
+    """
+    if template_text:
+        return _cached_compile(("text", template_text), template_text)
+    if prompt_id:
+        prompt = db.get_prompt_by_id(prompt_id)
+        if not prompt:
+            raise PromptTemplateError(f"Prompt {prompt_id} wurde nicht gefunden.")
+        return _cached_compile(("id", prompt["id"], prompt["updated_at"]), prompt["content"])
+    raise PromptTemplateError("Es wurde keine Prompt-Vorlage angegeben.")
+
+
+def participant_values(participant, additional_content="", observations=None):
+    """
+    Stellt die Platzhalterwerte für einen Teilnehmer zusammen. `observations`
+    ersetzt bei Bedarf die (gekürzten) Beobachtungen des Teilnehmers.
+    """
+    full_name = participant.get("name", "") or ""
+    first_name = full_name.split(" ")[0] if full_name else ""
+    if observations is None:
+        observations = participant.get("observations", {}) or {}
+    social_obs = observations.get("social", "") or ""
+    verbal_obs = observations.get("verbal", "") or ""
+    additional_content = additional_content or ""
+
+    context_block = (
+        f"ANALYSE-SUBJEKT:\n- Vorname: {first_name}\n- Ganzer Name: {full_name}\n\n"
+        f"BEOBACHTUNGEN ZUM VERHALTEN:\n- Soziale Kompetenzen: {social_obs}\n"
+        f"- Verbale Kompetenzen: {verbal_obs}\n\n"
+        f"ZUSÄTZLICHER KONTEXT:\n{additional_content}"
+    )
+    return {
+        "name": first_name,
+        "vorname": first_name,
+        "first_name": first_name,
+        "ganzer_name": full_name,
+        "social_observations": social_obs,
+        "verbal_observations": verbal_obs,
+        "additional_content": additional_content,
+        "context": context_block,
+    }
+
+
+def render_for_participant(compiled, participant, additional_content="", ki_model=None):
+    """
+    Rendert eine kompilierte Vorlage für einen Teilnehmer. Mit `ki_model` werden
+    Beobachtungen und Zusatzdokumente auf das Token-Budget des Providers gekürzt
+    und die geschätzte Prompt-Größe protokolliert.
+    """
+    if ki_model is None:
+        return compiled.render(participant_values(participant, additional_content))
+
+    observations = participant.get("observations", {}) or {}
+    observations = {"social": observations.get("social", "") or "",
+                    "verbal": observations.get("verbal", "") or ""}
+    # Der feste Teil: die Vorlage mit allen Werten außer Beobachtungen und Anhängen.
+    fixed_text = compiled.render(
+        participant_values(participant, "", {"social": "", "verbal": ""})
+    )
+    context_uses = compiled.fields.count("context")
+    uses = {
+        "social": compiled.fields.count("social_observations") + context_uses,
+        "verbal": compiled.fields.count("verbal_observations") + context_uses,
+        "additional_content": compiled.fields.count("additional_content") + context_uses,
+    }
+    observations, additional_content, report = PromptBudget(ki_model).apply(
+        fixed_text, observations, additional_content, uses
+    )
+    log_report(report)
+    return compiled.render(participant_values(participant, additional_content, observations))
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def input_fingerprint(compiled, participant, additional_content="", model_identity=None):
+    """
+    Bildet einen Fingerabdruck der Eingaben einer Analyse: Beobachtungen,
+    ungekürzt gerenderter Prompt, Zusatzdokumente und Modell. Solange sich keine
+    dieser Eingaben ändert, bleibt der Fingerabdruck gleich – auch im Packmodus,
+    da immer der Einzel-Prompt zugrunde gelegt wird.
+    """
+    observations = participant.get("observations", {}) or {}
+    parts = {
+        "observations": _sha256(json.dumps(observations, sort_keys=True, ensure_ascii=False)),
+        "prompt": _sha256(compiled.render(participant_values(participant, additional_content))),
+        "additional_content": _sha256(additional_content or ""),
+        "model": model_identity,
+    }
+    return _sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False))
+
+
+def is_packable(compiled):
+    """Prüft, ob eine Vorlage für mehrere Teilnehmer gemeinsam gerendert werden kann."""
+    return "context" in compiled.placeholders and compiled.placeholders <= PACKABLE_PLACEHOLDERS
+
+
+def render_packed(compiled, participants, additional_content="", ki_model=None):
+    """
+    Rendert eine Vorlage für mehrere Teilnehmer in einem Prompt. Der Kontext
+    enthält je Teilnehmer einen mit seiner ID überschriebenen Block; die
+    Zusatzdokumente werden nur einmal angehängt. Wirft einen PromptTemplateError,
+    wenn die Vorlage nicht für den Packmodus geeignet ist.
+    """
+    if not is_packable(compiled):
+        raise PromptTemplateError(
+            "Die Vorlage kann nicht für mehrere Teilnehmer gemeinsam verwendet werden; "
+            "erlaubt sind nur {{context}} und {{additional_content}}."
+        )
+    budget = PromptBudget(ki_model) if ki_model else None
+    blocks = []
+    for participant in participants:
+        full_name = participant.get("name", "") or ""
+        observations = participant.get("observations", {}) or {}
+        social_obs = observations.get("social", "") or ""
+        verbal_obs = observations.get("verbal", "") or ""
+        if budget:
+            social_obs = truncate_head_tail(social_obs, budget.max_observation_tokens, ki_model)
+            verbal_obs = truncate_head_tail(verbal_obs, budget.max_observation_tokens, ki_model)
+        blocks.append(
+            PACKED_SUBJECT_HEADER.format(participant_id=participant["id"]) + "\n"
+            f"- Vorname: {full_name.split(' ')[0] if full_name else ''}\n"
+            f"- Ganzer Name: {full_name}\n"
+            f"BEOBACHTUNGEN ZUM VERHALTEN:\n- Soziale Kompetenzen: {social_obs}\n"
+            f"- Verbale Kompetenzen: {verbal_obs}"
+        )
+    subjects = "\n\n".join(blocks)
+    instruction = PACKED_INSTRUCTION.format(
+        count=len(participants), ids=", ".join(str(p["id"]) for p in participants)
+    )
+
+    def values(content):
+        return {
+            "context": (f"ANALYSE-SUBJEKTE:\n\n{subjects}\n\n"
+                        f"ZUSÄTZLICHER KONTEXT (gilt für alle Personen):\n{content}"),
+            "additional_content": content,
+        }
+
+    additional_content = additional_content or ""
+    if budget:
+        uses = {"additional_content": compiled.fields.count("additional_content")
+                                      + compiled.fields.count("context")}
+        _, additional_content, report = budget.apply(
+            compiled.render(values("")) + instruction, {}, additional_content, uses
+        )
+        log_report(report)
+    return compiled.render(values(additional_content)) + instruction
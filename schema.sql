@@ -1,6 +1,7 @@
 -- Löscht bestehende Tabellen, um einen sauberen Neuaufbau zu gewährleisten.
 DROP TABLE IF EXISTS groups;
 DROP TABLE IF EXISTS participants;
+DROP TABLE IF EXISTS participant_ratings;
 
 -- Erstellt die Tabelle für die Assessment-Gruppen.
 CREATE TABLE groups (
@@ -11,7 +12,9 @@ CREATE TABLE groups (
     leitung TEXT,
     beobachter1 TEXT,
     beobachter2 TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    revision INTEGER NOT NULL DEFAULT 0 -- wird bei jeder Änderung erhöht (PDF-Cache-Schlüssel)
 );
 
 -- Erstellt die Tabelle für die Teilnehmer.
@@ -26,11 +29,27 @@ CREATE TABLE participants (
     ki_texts TEXT,     -- JSON-String für die von der KI generierten und vom User bearbeiteten Texte
     ki_raw_response TEXT, -- NEU: JSON-String für die rohe, unveränderte KI-Antwort
     footer_data TEXT,  -- JSON-String für Footer-Daten
+    ki_input_fingerprint TEXT, -- Fingerabdruck der Eingaben der letzten erfolgreichen KI-Analyse
+    ki_analysis_status TEXT,   -- Ergebnis der letzten KI-Analyse: success oder error
+    ki_analyzed_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    revision INTEGER NOT NULL DEFAULT 0, -- wird bei jeder Änderung erhöht (PDF-Cache-Schlüssel)
     FOREIGN KEY (group_id) REFERENCES groups (id)
 );
 
+-- Bewertungen im Langformat (gespiegelt aus sk_ratings/vk_ratings) für Auswertungen in SQL.
+CREATE TABLE participant_ratings (
+    participant_id INTEGER NOT NULL,
+    group_id INTEGER NOT NULL, -- redundant zu participants.group_id für Auswertungen je Gruppe
+    scale TEXT NOT NULL,       -- 'sk' (soziale) oder 'vk' (verbale Kompetenzen)
+    competency TEXT NOT NULL,  -- Schlüssel wie in den JSON-Spalten, z. B. 'flexibility'
+    value REAL,
+    PRIMARY KEY (participant_id, scale, competency)
+) WITHOUT ROWID;
+CREATE INDEX idx_ratings_group ON participant_ratings (group_id, scale, competency, value);
+CREATE INDEX idx_ratings_competency ON participant_ratings (scale, competency, value);
+
 -- Erstellt die Tabelle für die KI-Prompts.
 CREATE TABLE prompts (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,4 +58,27 @@ CREATE TABLE prompts (
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Protokoll aller KI-Aufrufe (Dauer, Tokens, Ergebnis) für Auswertungen.
+CREATE TABLE IF NOT EXISTS ai_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    participant_id INTEGER,
+    provider TEXT NOT NULL,          -- tatsächlich genutzter Provider
+    requested_provider TEXT,         -- angefragter Provider (abweichend bei Hedging/Umleitung)
+    model TEXT,
+    prompt_hash TEXT,                -- SHA-256 des Prompts
+    prompt_chars INTEGER,
+    response_chars INTEGER,
+    estimated_prompt_tokens INTEGER,
+    prompt_tokens INTEGER,           -- laut Provider, falls gemeldet
+    completion_tokens INTEGER,       -- laut Provider, falls gemeldet
+    latency_ms INTEGER,
+    retries INTEGER DEFAULT 0,
+    streamed INTEGER DEFAULT 0,
+    outcome TEXT NOT NULL,           -- success, cache_hit, invalid_response, error
+    error_class TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_created_at ON ai_calls (created_at);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_provider ON ai_calls (provider, created_at);
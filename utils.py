@@ -1,44 +1,237 @@
 """Dieses Modul enthält Hilfsfunktionen für Dateiverarbeitung und Textbereinigung."""
 
-import io
+import hashlib
 import mimetypes
+import multiprocessing
+import os
 import re
+import tempfile
+import threading
+import time
 
-from docx import Document
-from pdfminer.high_level import extract_text as pdf_extract_text
-from pdfminer.layout import LAParams
-from pdfminer.pdfparser import PDFSyntaxError
+from disk_cache import DiskCache
 
+# Bei Änderungen an der Extraktionslogik erhöhen, damit alte Cache-Einträge verfallen.
+EXTRACTOR_VERSION = 1
+EXTRACTION_CACHE_MAX_BYTES = int(
+    os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(100 * 1024 * 1024))
+)
 
-def get_file_content(file):
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_TIMEOUT_SECONDS = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "200"))
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+_extraction_cache = DiskCache("extracted_text", max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+                              suffix=".txt")
+_extraction_pool = None
+_pool_lock = threading.Lock()
+
+
+def _document_kind(mimetype):
+    """Ordnet einen MIME-Typ einem der unterstützten Extraktoren zu."""
+    if mimetype == 'application/pdf':
+        return "pdf"
+    if mimetype == DOCX_MIMETYPE:
+        return "docx"
+    if mimetype and mimetype.startswith('text/'):
+        return "text"
+    return None
+
+
+def _extract_path(path, kind, max_pages):
     """
-    Liest den Inhalt von hochgeladenen Dateien (PDF, DOCX, TXT) robust.
+    Extrahiert den Text aus einer gespoolten Datei. Läuft in einem Worker-Prozess;
+    Parserfehler werden als ValueError gemeldet.
     """
-    filename = file.filename
-    content = ""
-    try:
-        file_buffer = io.BytesIO(file.read())
-        mimetype = mimetypes.guess_type(filename)[0]
-
-        if mimetype == 'application/pdf':
-            content = pdf_extract_text(file_buffer, laparams=LAParams())
-        elif mimetype == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
-            doc = Document(file_buffer)
-            content = "\n".join([para.text for para in doc.paragraphs if para.text])
-        elif mimetype and mimetype.startswith('text/'):
-            content = file_buffer.read().decode('utf-8', errors='ignore')
-        else:
-            mimetype_str = mimetype if mimetype else "Unbekannt"
-            content = f"--- FEHLER: Dateityp '{mimetype_str}' wird nicht unterstützt. ---"
-        if not content or not content.strip():
-            content = f"--- HINWEIS: Aus '{filename}' konnte kein Text extrahiert werden. ---"
-    except (PDFSyntaxError, ValueError, IOError) as e:
-        content = f"--- FEHLER beim Verarbeiten von '{filename}': {str(e)} ---"
+    # pdfminer und python-docx werden erst bei der ersten Extraktion geladen.
+    # pylint: disable=import-outside-toplevel
+    if kind == "pdf":
+        from pdfminer.high_level import extract_text as pdf_extract_text
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfparser import PDFSyntaxError
+        try:
+            return pdf_extract_text(path, laparams=LAParams(), maxpages=max_pages or 0)
+        except PDFSyntaxError as e:
+            raise ValueError(str(e)) from e
+    if kind == "docx":
+        from docx import Document
+        doc = Document(path)
+        return "\n".join([para.text for para in doc.paragraphs if para.text])
+    with open(path, "rb") as handle:
+        return handle.read().decode('utf-8', errors='ignore')
+
+
+def extraction_cache_key(digest, kind):
+    """Schlüssel für den Extraktions-Cache: SHA-256 der Datei, Typ und Extraktor-Version."""
+    return f"{digest}-{kind}-v{EXTRACTOR_VERSION}"
+
+
+def _spool_upload(file):
+    """
+    Schreibt einen Upload blockweise in eine temporäre Datei, statt ihn komplett
+    in den Speicher zu lesen, und berechnet dabei den SHA-256-Hash.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(file.filename)[1])
+    with os.fdopen(fd, "wb") as handle:
+        while True:
+            chunk = file.read(SPOOL_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            handle.write(chunk)
+    return path, digest.hexdigest()
+
+
+def _wrap_content(filename, content):
+    """Rahmt den extrahierten Text mit Start- und Endmarkierung der Datei ein."""
+    if not content or not content.strip():
+        content = f"--- HINWEIS: Aus '{filename}' konnte kein Text extrahiert werden. ---"
     return (f"--- START INHALT AUS DATEI: {filename} ---\n"
             f"{content.strip()}\n"
             f"--- ENDE INHALT AUS DATEI: {filename} ---")
 
 
+def _get_extraction_pool():
+    """Gibt den Prozess-Pool für Extraktionen zurück und legt ihn beim ersten Aufruf an."""
+    global _extraction_pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = multiprocessing.get_context("spawn").Pool(
+                processes=max(1, EXTRACTION_WORKERS)
+            )
+        return _extraction_pool
+
+
+def _reset_extraction_pool():
+    """Beendet den Pool (z. B. mit hängenden Workern nach einem Zeitlimit)."""
+    global _extraction_pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.terminate()
+        _extraction_pool = None
+
+
+def _run_extractions(pending):
+    """
+    Führt die Extraktionen aus: Textdateien direkt, PDF und DOCX im langlebigen
+    Prozess-Pool (pdfminer ist CPU-gebunden). Jede Datei erhält ein eigenes
+    Zeitlimit; nach einer Zeitüberschreitung wird der Pool mit den hängenden
+    Workern beendet und beim nächsten Upload neu angelegt.
+    Gibt pro Eintrag den Text oder eine Exception zurück.
+    """
+    results = [None] * len(pending)
+    pooled = []
+    for index, item in enumerate(pending):
+        if item["kind"] == "text":
+            try:
+                results[index] = _extract_path(item["path"], item["kind"], EXTRACTION_MAX_PAGES)
+            except IOError as e:
+                results[index] = e
+        else:
+            pooled.append(index)
+    if not pooled:
+        return results
+
+    workers = max(1, EXTRACTION_WORKERS)
+    pool = _get_extraction_pool()
+    async_results = [
+        pool.apply_async(_extract_path, (pending[index]["path"], pending[index]["kind"],
+                                         EXTRACTION_MAX_PAGES))
+        for index in pooled
+    ]
+    started = time.monotonic()
+    timed_out = False
+    for position, (index, async_result) in enumerate(zip(pooled, async_results)):
+        # Dateien jenseits der ersten "Welle" starten erst, wenn ein Worker frei wird.
+        deadline = started + EXTRACTION_TIMEOUT_SECONDS * (position // workers + 1)
+        try:
+            results[index] = async_result.get(timeout=max(0.0, deadline - time.monotonic()))
+        except multiprocessing.TimeoutError:
+            timed_out = True
+            results[index] = TimeoutError(
+                f"Zeitlimit von {EXTRACTION_TIMEOUT_SECONDS:g}s überschritten"
+            )
+        except (ValueError, IOError) as e:
+            results[index] = e
+        except Exception as e:  # pylint: disable=broad-except
+            results[index] = ValueError(f"{type(e).__name__}: {e}")
+    if timed_out:
+        _reset_extraction_pool()
+    return results
+
+
+def get_files_content(files):
+    """
+    Liest den Inhalt mehrerer hochgeladener Dateien (PDF, DOCX, TXT).
+    Uploads werden auf die Festplatte gespoolt, bereits bekannte Dateien aus dem
+    Extraktions-Cache gelesen und die übrigen parallel extrahiert.
+    Gibt die Inhalte in der Reihenfolge der Dateien zurück.
+    """
+    contents = [None] * len(files)
+    pending = []
+    try:
+        for index, file in enumerate(files):
+            filename = file.filename
+            mimetype = mimetypes.guess_type(filename)[0]
+            kind = _document_kind(mimetype)
+            if kind is None:
+                mimetype_str = mimetype if mimetype else "Unbekannt"
+                contents[index] = _wrap_content(
+                    filename, f"--- FEHLER: Dateityp '{mimetype_str}' wird nicht unterstützt. ---"
+                )
+                continue
+            try:
+                path, digest = _spool_upload(file)
+            except IOError as e:
+                contents[index] = _wrap_content(
+                    filename, f"--- FEHLER beim Verarbeiten von '{filename}': {str(e)} ---"
+                )
+                continue
+            cache_key = extraction_cache_key(digest, kind)
+            cached = _extraction_cache.get(cache_key)
+            if cached is not None:
+                os.remove(path)
+                contents[index] = _wrap_content(filename, cached.decode('utf-8'))
+                continue
+            pending.append({"index": index, "filename": filename, "kind": kind,
+                            "path": path, "cache_key": cache_key})
+
+        if pending:
+            for item, result in zip(pending, _run_extractions(pending)):
+                if isinstance(result, Exception):
+                    content = (f"--- FEHLER beim Verarbeiten von '{item['filename']}': "
+                               f"{str(result)} ---")
+                else:
+                    content = result
+                    _extraction_cache.put(item["cache_key"], content.encode('utf-8'))
+                contents[item["index"]] = _wrap_content(item["filename"], content)
+    finally:
+        for item in pending:
+            try:
+                os.remove(item["path"])
+            except OSError:
+                pass
+    return contents
+
+
+def get_file_content(file):
+    """
+    Liest den Inhalt von hochgeladenen Dateien (PDF, DOCX, TXT) robust.
+    Bereits extrahierte Dateien werden anhand ihres Inhalts-Hashs aus dem
+    Extraktions-Cache gelesen.
+    """
+    return get_files_content([file])[0]
+
+
+def extraction_cache_stats():
+    """Gibt die Kennzahlen des Extraktions-Caches zurück."""
+    return _extraction_cache.stats()
+
+
 def clean_json_response(raw_response):
     """
     Bereinigt die JSON-Antwort von KI-Modellen, entfernt Code-Blöcke